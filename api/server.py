@@ -5,30 +5,50 @@
 
 import asyncio
 import os
-import sys
-import json
-import glob
 import re
+import sys
+import time
+from collections import deque
 from pathlib import Path
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import BackgroundTasks, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Optional
-import uvicorn
+import orjson
+from contextlib import asynccontextmanager
 
 # 添加项目根目录到路径
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, PROJECT_ROOT)
-sys.path.insert(0, os.path.join(PROJECT_ROOT, "core"))
 
-from core.pipeline import PublishPipeline, Logger
+from core.pipeline import PublishPipeline, Logger, TEMP_OUTPUT_DIR
 from core.config_manager import ConfigManager
 from config import AVAILABLE_MODELS, AVAILABLE_TEMPLATES, PROMPT_STYLES
 
 # ================== FastAPI 应用 ==================
-app = FastAPI(title="小红书发布工具 API", version="2.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """应用生命周期：启动/停止后台保活任务"""
+    global event_loop
+    event_loop = asyncio.get_running_loop()
+    reaper_task = asyncio.create_task(_reaper())
+    try:
+        yield
+    finally:
+        reaper_task.cancel()
+        if current_pipeline is not None:
+            await current_pipeline.aclose()
+        config_manager.flush()
+
+
+app = FastAPI(
+    title="小红书发布工具 API",
+    version="2.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 # CORS (允许手机跨域访问)
 app.add_middleware(
@@ -41,59 +61,117 @@ app.add_middleware(
 # 静态文件 (PWA 前端)
 STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
 os.makedirs(STATIC_DIR, exist_ok=True)
+INDEX_HTML = Path(STATIC_DIR) / "index.html"
 
-# 图片输出目录
-TEMP_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "core", "temp_output")
+# 图片输出目录 (每次渲染在其下创建独立的临时子目录)
+os.makedirs(TEMP_OUTPUT_DIR, exist_ok=True)
+
+# 当前可访问的图片 (相对 TEMP_OUTPUT_DIR 的路径，渲染完成后刷新，请求时先查集合，未命中直接 404)
+_image_set: set[str] = set()
+# 合法图片路径：可选的一级临时目录 + 文件名 (拒绝 .. 等，避免触碰文件系统)
+_SAFE_IMAGE_NAME = re.compile(r"^(?:[A-Za-z0-9_\-]{1,64}[\\/])?[A-Za-z0-9_\-.]{1,128}\.png$")
+
+# 模板选项 (AVAILABLE_TEMPLATES 不可变，预先构建)
+TEMPLATE_OPTIONS = [{"id": t[0], "name": t[1]} for t in AVAILABLE_TEMPLATES]
 
 # ================== 全局状态 ==================
+# 注意：以下状态均保存在进程内 (生成结果 → 确认发布依赖同一个 current_pipeline)，
+# 因此服务必须以单 worker 运行，不能使用 uvicorn --workers N。
 config_manager = ConfigManager()
-active_connections: list[WebSocket] = []
+active_connections: set[WebSocket] = set()
 current_pipeline: Optional[PublishPipeline] = None
+pipeline_lock = asyncio.Lock()  # 同一时间只允许一个流水线任务 (渲染/发布占用大量 CPU)
+_config_cache = {"version": -1, "body": b""}  # /api/config 响应缓存 (已序列化的 JSON)
+
+# 每个连接独立的有界发送队列，慢客户端只会丢自己的旧日志，不拖慢其他连接
+WS_SEND_QUEUE_SIZE = 256
+event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+# WebSocket 保活：定期 ping，超时未收到客户端消息则断开
+WS_PING_INTERVAL = 20  # 秒
+WS_STALE_TIMEOUT = 60  # 秒
 
 
 # ================== WebSocket 日志广播 ==================
+class SendQueue:
+    """单个连接的有界发送队列：满时丢弃最旧的普通消息，优先保留进度消息"""
+
+    def __init__(self, maxsize: int = WS_SEND_QUEUE_SIZE):
+        self.maxsize = maxsize
+        self._items: deque[tuple[bool, str]] = deque()
+        self._ready = asyncio.Event()
+
+    def put(self, frame: str, priority: bool = False):
+        if len(self._items) >= self.maxsize:
+            self._drop_oldest()
+        self._items.append((priority, frame))
+        self._ready.set()
+
+    def _drop_oldest(self):
+        for i, (priority, _) in enumerate(self._items):
+            if not priority:
+                del self._items[i]
+                return
+        self._items.popleft()
+
+    async def get(self) -> str:
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        return self._items.popleft()[1]
+
+
+async def _writer(websocket: WebSocket):
+    """连接专属的发送任务：依次发送队列中的消息，发送失败即移除连接"""
+    queue: SendQueue = websocket.state.send_queue
+    try:
+        while True:
+            await websocket.send_text(await queue.get())
+    except Exception:
+        active_connections.discard(websocket)
+
+
+def _broadcast(payload: dict, priority: bool = False):
+    """投递到所有客户端的发送队列 (不等待实际发送)"""
+    if not active_connections:
+        return
+    # 只序列化一次，所有连接复用同一文本帧
+    text = orjson.dumps(payload).decode("utf-8")
+    for ws in active_connections:
+        ws.state.send_queue.put(text, priority)
+
+
 async def broadcast_log(message: str):
     """向所有连接的客户端广播日志"""
-    disconnected = []
-    for ws in active_connections:
-        try:
-            await ws.send_json({"type": "log", "message": message})
-        except Exception:
-            disconnected.append(ws)
-    for ws in disconnected:
-        if ws in active_connections:
-            active_connections.remove(ws)
+    _broadcast({"type": "log", "message": message})
 
 
 async def broadcast_progress(value: float):
     """广播进度"""
-    disconnected = []
-    for ws in active_connections:
-        try:
-            await ws.send_json({"type": "progress", "value": value})
-        except Exception:
-            disconnected.append(ws)
-    for ws in disconnected:
-        if ws in active_connections:
-            active_connections.remove(ws)
+    _broadcast({"type": "progress", "value": value}, priority=True)
 
 
-def sync_log_callback(msg: str):
-    """同步日志回调 - Logger.log() 会调用此函数，安全推送到事件循环"""
+def _post_threadsafe(payload: dict, priority: bool = False) -> bool:
+    """从任意线程投递广播消息到事件循环"""
+    if event_loop is None:
+        return False
     try:
-        loop = asyncio.get_running_loop()
-        loop.create_task(broadcast_log(msg))
+        event_loop.call_soon_threadsafe(_broadcast, payload, priority)
+        return True
     except RuntimeError:
+        # 事件循环已关闭
+        return False
+
+
+def sync_log_callback(msg: str):
+    """同步日志回调 - Logger.log() 会调用此函数，线程安全地推送到事件循环"""
+    if not _post_threadsafe({"type": "log", "message": msg}):
         print(msg)
 
 
 def sync_progress_callback(value: float):
     """同步进度回调"""
-    try:
-        loop = asyncio.get_running_loop()
-        loop.create_task(broadcast_progress(value))
-    except RuntimeError:
-        pass
+    _post_threadsafe({"type": "progress", "value": value}, priority=True)
 
 
 def create_pipeline(model: str, template: str) -> PublishPipeline:
@@ -123,23 +201,15 @@ class PublishRequest(BaseModel):
 @app.get("/")
 async def index():
     """返回 PWA 首页"""
-    return FileResponse(os.path.join(STATIC_DIR, "index.html"))
+    return FileResponse(INDEX_HTML)
 
 
-@app.get("/api/config")
-async def get_config():
-    """获取可用配置选项"""
-    prompts_data = config_manager.prompts
-    prompt_templates = []
-    for t in prompts_data.get("templates", []):
-        prompt_templates.append({
-            "name": t["name"],
-            "description": t.get("description", ""),
-        })
-
+def _build_config() -> dict:
+    """构建 /api/config 响应内容"""
+    prompt_templates = config_manager.prompt_view()
     return {
         "models": AVAILABLE_MODELS,
-        "templates": [{"id": t[0], "name": t[1]} for t in AVAILABLE_TEMPLATES],
+        "templates": TEMPLATE_OPTIONS,
         "prompt_styles": prompt_templates or [
             {"name": s[0], "description": s[1]} for s in PROMPT_STYLES
         ],
@@ -152,59 +222,75 @@ async def get_config():
     }
 
 
+@app.get("/api/config")
+async def get_config():
+    """获取可用配置选项 (按配置版本缓存序列化结果)"""
+    if _config_cache["version"] != config_manager.version:
+        _config_cache["body"] = orjson.dumps(_build_config())
+        _config_cache["version"] = config_manager.version
+    return Response(content=_config_cache["body"], media_type="application/json")
+
+
 @app.post("/api/generate")
 async def generate(req: GenerateRequest):
     """手动模式：抓取 + AI 生成 + 渲染图片，返回预览"""
     global current_pipeline
 
-    await broadcast_log("📱 收到手动生成请求")
+    if pipeline_lock.locked():
+        return ORJSONResponse(status_code=429, content={"error": "已有任务在执行，请稍后再试"})
 
-    # 获取 prompt 模板
-    prompt_data = config_manager.get_prompt_by_name(req.prompt_style)
-    if not prompt_data:
-        return JSONResponse(status_code=400, content={"error": f"找不到提示词模板: {req.prompt_style}"})
-    prompt_template = prompt_data["prompt"]
+    async with pipeline_lock:
+        await broadcast_log("📱 收到手动生成请求")
 
-    # 创建 pipeline
-    pipeline = create_pipeline(req.model, req.template)
-    current_pipeline = pipeline
+        # 获取 prompt 模板
+        prompt_data = config_manager.get_prompt_by_name(req.prompt_style)
+        if not prompt_data:
+            return ORJSONResponse(status_code=400, content={"error": f"找不到提示词模板: {req.prompt_style}"})
+        prompt_template = prompt_data["prompt"]
 
-    try:
-        # 1. 抓取
-        await broadcast_log(f"🔗 正在抓取: {req.url}")
-        result = await pipeline.scrape_lightweight(req.url)
-        if not result:
-            return JSONResponse(status_code=500, content={"error": "抓取失败"})
-
-        # 2. AI 生成
-        await broadcast_log("🧠 AI 正在生成内容...")
-        result = pipeline.generate_content(prompt_template)
-        if not result:
-            return JSONResponse(status_code=500, content={"error": "AI 生成失败"})
-
-        # 3. 渲染图片
-        await broadcast_log("🎨 正在渲染图片...")
-        image_paths = pipeline.render_images()
-        if not image_paths:
-            return JSONResponse(status_code=500, content={"error": "渲染失败"})
-
-        await broadcast_log(f"✅ 生成完成！共 {len(image_paths)} 张图片")
-
-        # 返回预览数据
-        image_urls = [f"/api/images/{os.path.basename(p)}" for p in image_paths]
-
-        return {
-            "success": True,
-            "cover_title": pipeline.ai_data.get("cover_title", ""),
-            "caption_title": pipeline.ai_data.get("caption_title", ""),
-            "content_body": pipeline.ai_data.get("content_body", ""),
-            "images": image_urls,
-            "image_count": len(image_urls),
-        }
+        # 创建 pipeline (先释放上一个 pipeline 的连接池等资源)
+        if current_pipeline is not None:
+            await current_pipeline.aclose()
+        pipeline = create_pipeline(req.model, req.template)
+        current_pipeline = pipeline
 
-    except Exception as e:
-        await broadcast_log(f"❌ 生成失败: {e}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        try:
+            # 1. 抓取
+            await broadcast_log(f"🔗 正在抓取: {req.url}")
+            result = await pipeline.scrape_lightweight(req.url)
+            if not result:
+                return ORJSONResponse(status_code=500, content={"error": "抓取失败"})
+
+            # 2. AI 生成
+            await broadcast_log("🧠 AI 正在生成内容...")
+            result = await pipeline.generate_content(prompt_template)
+            if not result:
+                return ORJSONResponse(status_code=500, content={"error": "AI 生成失败"})
+
+            # 3. 渲染图片
+            await broadcast_log("🎨 正在渲染图片...")
+            image_paths = await asyncio.to_thread(pipeline.render_images)
+            _refresh_image_set(image_paths)
+            if not image_paths:
+                return ORJSONResponse(status_code=500, content={"error": "渲染失败"})
+
+            await broadcast_log(f"✅ 生成完成！共 {len(image_paths)} 张图片")
+
+            # 返回预览数据 (附带版本号，重新生成后 URL 变化，可放心长期缓存)
+            image_urls = [f"/api/images/{_image_relpath(p).replace(os.sep, '/')}?v={_image_version(os.stat(p))}" for p in image_paths]
+
+            return {
+                "success": True,
+                "cover_title": pipeline.ai_data.get("cover_title", ""),
+                "caption_title": pipeline.ai_data.get("caption_title", ""),
+                "content_body": pipeline.ai_data.get("content_body", ""),
+                "images": image_urls,
+                "image_count": len(image_urls),
+            }
+
+        except Exception as e:
+            await broadcast_log(f"❌ 生成失败: {e}")
+            return ORJSONResponse(status_code=500, content={"error": str(e)})
 
 
 @app.post("/api/publish")
@@ -212,93 +298,159 @@ async def publish(req: PublishRequest):
     """手动模式第二步：确认发布到小红书"""
     global current_pipeline
 
-    if not current_pipeline or not current_pipeline.image_paths:
-        return JSONResponse(status_code=400, content={"error": "没有可发布的内容，请先生成"})
+    if pipeline_lock.locked():
+        return ORJSONResponse(status_code=429, content={"error": "已有任务在执行，请稍后再试"})
 
-    await broadcast_log("🚀 开始发布到小红书...")
+    async with pipeline_lock:
+        if not current_pipeline or not current_pipeline.image_paths:
+            return ORJSONResponse(status_code=400, content={"error": "没有可发布的内容，请先生成"})
 
-    try:
-        success = await current_pipeline.publish(headless=True, auto_publish=True)
-        if success:
-            current_pipeline.archive()
-            await broadcast_log("✅ 发布成功！")
-            return {"success": True, "message": "发布成功"}
-        else:
-            await broadcast_log("❌ 发布失败")
-            return JSONResponse(status_code=500, content={"error": "发布失败"})
-    except Exception as e:
-        await broadcast_log(f"❌ 发布出错: {e}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        await broadcast_log("🚀 开始发布到小红书...")
+
+        success = False
+        try:
+            success = await current_pipeline.publish(headless=True, auto_publish=True)
+            if success:
+                await broadcast_log("✅ 发布成功！")
+                return {"success": True, "message": "发布成功"}
+            else:
+                await broadcast_log("❌ 发布失败")
+                return ORJSONResponse(status_code=500, content={"error": "发布失败"})
+        except Exception as e:
+            await broadcast_log(f"❌ 发布出错: {e}")
+            return ORJSONResponse(status_code=500, content={"error": str(e)})
+        finally:
+            # 只释放浏览器，生成的图片保留到下次生成时再清理 (前端可能仍在预览)
+            await current_pipeline.close_sessions()
+            if success:
+                # 不阻塞响应；下次生成前的 aclose() 会等归档完成再删图片
+                current_pipeline.archive_in_background()
 
 
 @app.post("/api/auto-publish")
-async def auto_publish(req: GenerateRequest):
+async def auto_publish(req: GenerateRequest, background_tasks: BackgroundTasks):
     """自动模式：全流程一键完成"""
     global current_pipeline
 
-    await broadcast_log("🤖 自动发布模式启动")
+    if pipeline_lock.locked():
+        return ORJSONResponse(status_code=429, content={"error": "已有任务在执行，请稍后再试"})
 
-    # 获取 prompt 模板
-    prompt_data = config_manager.get_prompt_by_name(req.prompt_style)
-    if not prompt_data:
-        return JSONResponse(status_code=400, content={"error": f"找不到提示词模板: {req.prompt_style}"})
-    prompt_template = prompt_data["prompt"]
+    async with pipeline_lock:
+        await broadcast_log("🤖 自动发布模式启动")
 
-    # 创建 pipeline
-    pipeline = create_pipeline(req.model, req.template)
-    current_pipeline = pipeline
+        # 获取 prompt 模板
+        prompt_data = config_manager.get_prompt_by_name(req.prompt_style)
+        if not prompt_data:
+            return ORJSONResponse(status_code=400, content={"error": f"找不到提示词模板: {req.prompt_style}"})
+        prompt_template = prompt_data["prompt"]
 
-    try:
-        success = await pipeline.run_full_pipeline(
-            url=req.url,
-            prompt_template=prompt_template,
-            cloud_mode=True
-        )
+        # 创建 pipeline (先释放上一个 pipeline 的连接池等资源)
+        if current_pipeline is not None:
+            await current_pipeline.aclose()
+        pipeline = create_pipeline(req.model, req.template)
+        current_pipeline = pipeline
+
+        try:
+            success = await pipeline.run_full_pipeline(
+                url=req.url,
+                prompt_template=prompt_template,
+                cloud_mode=True
+            )
+            _refresh_image_set(pipeline.image_paths)
 
-        if success:
-            await broadcast_log("✅ 自动发布完成！")
-            return {"success": True, "message": "自动发布成功"}
-        else:
-            await broadcast_log("❌ 自动发布失败")
-            return JSONResponse(status_code=500, content={"error": "自动发布失败"})
+            if success:
+                await broadcast_log("✅ 自动发布完成！")
+                return {"success": True, "message": "自动发布成功"}
+            else:
+                await broadcast_log("❌ 自动发布失败")
+                return ORJSONResponse(status_code=500, content={"error": "自动发布失败"})
 
-    except Exception as e:
-        await broadcast_log(f"❌ 自动发布出错: {e}")
-        return JSONResponse(status_code=500, content={"error": str(e)})
+        except Exception as e:
+            await broadcast_log(f"❌ 自动发布出错: {e}")
+            return ORJSONResponse(status_code=500, content={"error": str(e)})
+        finally:
+            # 响应发出后再等待后台归档并释放浏览器，图片保留到下次生成时再清理 (前端仍需预览/发布)
+            background_tasks.add_task(pipeline.close_sessions)
 
 
-@app.get("/api/images/{filename}")
-async def get_image(filename: str):
-    """提供生成图片的访问"""
-    file_path = os.path.join(TEMP_OUTPUT_DIR, filename)
-    if os.path.exists(file_path):
-        return FileResponse(file_path, media_type="image/png")
-    return JSONResponse(status_code=404, content={"error": "图片不存在"})
+# ================== 图片服务 ==================
+def _image_relpath(path: str) -> str:
+    return os.path.relpath(path, TEMP_OUTPUT_DIR)
+
+
+def _refresh_image_set(image_paths: list[str]):
+    """渲染完成后刷新可访问图片集合 (旧 pipeline 的临时目录会被清理)"""
+    _image_set.clear()
+    _image_set.update(_image_relpath(p) for p in image_paths)
+
+
+def _image_version(st: os.stat_result) -> str:
+    """根据文件大小和修改时间生成版本号 (用于 URL 缓存破坏)"""
+    return f"{st.st_size:x}-{st.st_mtime_ns:x}"
+
+
+class ImageFiles(StaticFiles):
+    """生成图片的静态服务：StaticFiles 自带 ETag/304，额外加上长期缓存头"""
+
+    async def get_response(self, path: str, scope) -> Response:
+        if not _SAFE_IMAGE_NAME.match(path) or path not in _image_set:
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(self, *args, **kwargs) -> Response:
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
 
 
 # ================== WebSocket ==================
+PONG_FRAME = orjson.dumps({"type": "pong"}).decode("utf-8")
+
+
+async def _reaper():
+    """后台保活任务：清理长时间无响应的半开连接，并向其余连接发送 ping"""
+    while True:
+        await asyncio.sleep(WS_PING_INTERVAL)
+        now = time.monotonic()
+        stale = [ws for ws in tuple(active_connections) if now - ws.state.last_seen > WS_STALE_TIMEOUT]
+        for ws in stale:
+            active_connections.discard(ws)
+        if stale:
+            await asyncio.gather(*(ws.close() for ws in stale), return_exceptions=True)
+        _broadcast({"type": "ping", "ts": int(time.time())})
+
+
 @app.websocket("/ws/logs")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket 日志实时推送"""
     await websocket.accept()
-    active_connections.append(websocket)
+    websocket.state.last_seen = time.monotonic()
+    websocket.state.send_queue = SendQueue()
+    writer_task = asyncio.create_task(_writer(websocket))
+    active_connections.add(websocket)
     try:
         while True:
             data = await websocket.receive_text()
+            # 任何客户端消息 (ping/pong) 都视为存活
+            websocket.state.last_seen = time.monotonic()
             if data == "ping":
-                await websocket.send_json({"type": "pong"})
+                websocket.state.send_queue.put(PONG_FRAME, priority=True)
     except WebSocketDisconnect:
-        if websocket in active_connections:
-            active_connections.remove(websocket)
+        pass
+    finally:
+        active_connections.discard(websocket)
+        writer_task.cancel()
 
 
 # 挂载静态文件 (放在最后，避免覆盖 API 路由)
+app.mount("/api/images", ImageFiles(directory=TEMP_OUTPUT_DIR, check_dir=False), name="images")
 app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
 
 # ================== 启动入口 ==================
 if __name__ == "__main__":
     import socket
+    import uvicorn
 
     hostname = socket.gethostname()
     local_ip = socket.gethostbyname(hostname)
@@ -311,4 +463,5 @@ if __name__ == "__main__":
     print(f"  (确保手机和电脑在同一 WiFi)")
     print("=" * 50)
 
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    # 单 worker 运行 (见「全局状态」说明)；loop/http 设为 auto：已安装 uvloop + httptools 时自动启用 (Windows 无 uvloop，回退 asyncio)
+    uvicorn.run(app, host="0.0.0.0", port=8080, loop="auto", http="auto")
@@ -81,6 +81,8 @@ function connectWebSocket() {
             appendLog(data.message);
         } else if (data.type === 'progress') {
             updateProgress(data.value);
+        } else if (data.type === 'ping') {
+            ws.send('pong');
         }
     };
 
@@ -1,5 +1,5 @@
 // Service Worker — 简单离线缓存
-const CACHE_NAME = 'xhs-publisher-v1';
+const CACHE_NAME = 'xhs-publisher-v2';
 const URLS_TO_CACHE = [
     '/',
     '/static/style.css',
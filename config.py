@@ -1,11 +1,17 @@
 # 配置管理模块
 import os
 import json
+import atexit
+import threading
+import weakref
 
 # 配置目录
 CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
 CONFIG_PATH = os.path.join(CONFIG_DIR, "config.json")
 
+# 配置写盘防抖间隔 (秒)，短时间内的多次修改合并为一次写入
+SAVE_DELAY = 1.0
+
 # 默认配置
 DEFAULT_CONFIG = {
     "api_key": "",
@@ -54,12 +60,28 @@ PROMPT_STYLES = [
     ("XHS常用", "完整版深度科技"),
 ]
 
+# 存活的配置实例 (弱引用，不阻止回收)，退出时统一写盘
+_instances = weakref.WeakSet()
+
+
+def _flush_all():
+    """进程退出时写入所有实例未保存的修改"""
+    for manager in list(_instances):
+        manager.flush()
+
+
+atexit.register(_flush_all)
+
 
 class ConfigManager:
     """配置管理器"""
     
     def __init__(self):
+        self._dirty = False
+        self._save_lock = threading.Lock()
+        self._save_timer = None
         self.config = self._load_config()
+        _instances.add(self)
     
     def _load_config(self) -> dict:
         """加载配置"""
@@ -76,18 +98,42 @@ class ConfigManager:
         return DEFAULT_CONFIG.copy()
     
     def save(self):
-        """保存配置"""
-        with open(CONFIG_PATH, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
+        """保存配置 (写临时文件后原子替换)"""
+        with self._save_lock:
+            self._dirty = False
+            snapshot = self.config.copy()
+            tmp_path = CONFIG_PATH + ".tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, CONFIG_PATH)
+    
+    def flush(self):
+        """如有未保存的修改，立即写盘"""
+        if self._dirty:
+            self.save()
+    
+    def _mark_dirty(self):
+        """标记配置已修改，延迟 SAVE_DELAY 秒后统一写盘"""
+        with self._save_lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(SAVE_DELAY, self._delayed_flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+    
+    def _delayed_flush(self):
+        with self._save_lock:
+            self._save_timer = None
+        self.flush()
     
     def get(self, key: str, default=None):
         """获取配置项"""
         return self.config.get(key, default)
     
     def set(self, key: str, value):
-        """设置配置项"""
+        """设置配置项 (延迟合并写盘)"""
         self.config[key] = value
-        self.save()
+        self._mark_dirty()
     
     def get_proxy(self) -> dict | None:
         """获取代理配置"""
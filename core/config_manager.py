@@ -2,13 +2,19 @@
 # 管理 API Key、模型列表、提示词模板等配置
 
 import os
-import json
+import atexit
+import threading
+import weakref
+import orjson
 
 # 配置文件路径
 CONFIG_DIR = os.path.dirname(os.path.abspath(__file__))
 USER_CONFIG_PATH = os.path.join(CONFIG_DIR, "user_config.json")
 PROMPTS_PATH = os.path.join(CONFIG_DIR, "prompts.json")
 
+# 配置写盘防抖间隔 (秒)，短时间内的多次修改合并为一次写入
+SAVE_DELAY = 1.0
+
 # 默认配置
 DEFAULT_CONFIG = {
     "api_keys": [],
@@ -27,39 +33,87 @@ DEFAULT_MODELS = [
     "gemini-1.5-flash"
 ]
 
+# 存活的配置实例 (弱引用，不阻止回收)，退出时统一写盘
+_instances = weakref.WeakSet()
+
+
+def _flush_all():
+    """进程退出时写入所有实例未保存的修改"""
+    for manager in list(_instances):
+        manager.flush()
+
+
+atexit.register(_flush_all)
+
 class ConfigManager:
     def __init__(self):
+        self._version = 0  # 每次修改递增，供外部缓存判断失效
+        self._dirty = False
+        self._save_lock = threading.Lock()
+        self._save_timer = None
+        self._prompt_view = None  # 模板名称/描述列表缓存 (不含 prompt 正文)
         self.config = self.load_config()
         self.prompts = self.load_prompts()
         self.models = DEFAULT_MODELS
+        _instances.add(self)
+    
+    @property
+    def version(self):
+        """配置版本号 (每次修改递增)，供外部缓存判断失效"""
+        return self._version
     
     # ================== 用户配置 ==================
     def load_config(self):
         """加载用户配置"""
         if os.path.exists(USER_CONFIG_PATH):
             try:
-                with open(USER_CONFIG_PATH, 'r', encoding='utf-8') as f:
-                    config = json.load(f)
-                    # 合并默认配置
-                    for k, v in DEFAULT_CONFIG.items():
-                        if k not in config:
-                            config[k] = v
-                    return config
+                with open(USER_CONFIG_PATH, 'rb') as f:
+                    config = orjson.loads(f.read())
+                # 合并默认配置
+                for k, v in DEFAULT_CONFIG.items():
+                    if k not in config:
+                        config[k] = v
+                return config
             except:
                 pass
         return DEFAULT_CONFIG.copy()
     
     def save_config(self):
-        """保存用户配置"""
-        with open(USER_CONFIG_PATH, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
+        """保存用户配置 (写临时文件后原子替换)"""
+        with self._save_lock:
+            self._dirty = False
+            snapshot = self.config.copy()
+            tmp_path = USER_CONFIG_PATH + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(orjson.dumps(snapshot, option=orjson.OPT_INDENT_2))
+            os.replace(tmp_path, USER_CONFIG_PATH)
+    
+    def flush(self):
+        """如有未保存的修改，立即写盘"""
+        if self._dirty:
+            self.save_config()
+    
+    def _mark_dirty(self):
+        """标记配置已修改，延迟 SAVE_DELAY 秒后统一写盘"""
+        self._version += 1
+        with self._save_lock:
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(SAVE_DELAY, self._delayed_flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+    
+    def _delayed_flush(self):
+        with self._save_lock:
+            self._save_timer = None
+        self.flush()
     
     def get(self, key, default=None):
         return self.config.get(key, default)
     
     def set(self, key, value):
         self.config[key] = value
-        self.save_config()
+        self._mark_dirty()
     
     # ================== API Key 管理 ==================
     def get_api_keys(self):
@@ -72,7 +126,7 @@ class ConfigManager:
         if key and key not in keys:
             keys.append(key)
             self.config["api_keys"] = keys
-            self.save_config()
+            self._mark_dirty()
     
     def get_current_api_key(self):
         return self.config.get("current_api_key", "")
@@ -93,47 +147,62 @@ class ConfigManager:
     # ================== 提示词模板 ==================
     def load_prompts(self):
         """加载提示词模板"""
+        data = {"templates": [], "last_used": ""}
         if os.path.exists(PROMPTS_PATH):
             try:
-                with open(PROMPTS_PATH, 'r', encoding='utf-8') as f:
-                    return json.load(f)
+                with open(PROMPTS_PATH, 'rb') as f:
+                    data = orjson.loads(f.read())
             except:
                 pass
-        return {"templates": [], "last_used": ""}
+        # 按名称索引，O(1) 查找
+        self._prompt_index = {t["name"]: t for t in data.get("templates", [])}
+        return data
     
     def save_prompts(self):
         """保存提示词模板"""
-        with open(PROMPTS_PATH, 'w', encoding='utf-8') as f:
-            json.dump(self.prompts, f, ensure_ascii=False, indent=2)
+        with open(PROMPTS_PATH, 'wb') as f:
+            f.write(orjson.dumps(self.prompts, option=orjson.OPT_INDENT_2))
+        self._prompt_view = None
+        self._version += 1
     
     def get_prompt_templates(self):
         """获取所有模板名称"""
         return [t["name"] for t in self.prompts.get("templates", [])]
     
+    def prompt_view(self):
+        """获取模板名称和描述列表 (缓存，模板保存后失效)"""
+        if self._prompt_view is None:
+            self._prompt_view = [
+                {"name": t["name"], "description": t.get("description", "")}
+                for t in self.prompts.get("templates", [])
+            ]
+        return self._prompt_view
+    
     def get_prompt_by_name(self, name):
         """根据名称获取模板"""
-        for t in self.prompts.get("templates", []):
-            if t["name"] == name:
-                return t
-        return None
+        return self._prompt_index.get(name)
     
     def save_prompt_template(self, name, description, prompt):
         """保存/更新模板"""
         templates = self.prompts.get("templates", [])
-        # 查找是否存在
-        for i, t in enumerate(templates):
-            if t["name"] == name:
-                templates[i] = {"name": name, "description": description, "prompt": prompt}
-                self.prompts["templates"] = templates
-                self.save_prompts()
-                return
-        # 新增
-        templates.append({"name": name, "description": description, "prompt": prompt})
+        new_template = {"name": name, "description": description, "prompt": prompt}
+        if name in self._prompt_index:
+            # 原位替换，保持顺序
+            for i, t in enumerate(templates):
+                if t["name"] == name:
+                    templates[i] = new_template
+                    break
+        else:
+            # 新增
+            templates.append(new_template)
+        self._prompt_index[name] = new_template
         self.prompts["templates"] = templates
         self.save_prompts()
     
     def delete_prompt_template(self, name):
         """删除模板"""
+        if self._prompt_index.pop(name, None) is None:
+            return
         templates = [t for t in self.prompts.get("templates", []) if t["name"] != name]
         self.prompts["templates"] = templates
         self.save_prompts()
@@ -0,0 +1,65 @@
+# llm_cache.py - AI 响应缓存
+# 以 (模型, 提示词模板, 原文) 为键，把 Gemini 的原始返回持久化到 SQLite，相同输入重复运行时直接命中
+
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+
+# 缓存文件路径
+CACHE_DIR = os.path.dirname(os.path.abspath(__file__))
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_cache.db")
+
+
+def make_cache_key(model_name, prompt_template, full_text):
+    """生成缓存键 (所有影响输出的输入都要参与计算)"""
+    raw = f"{model_name}\0{prompt_template}\0{full_text}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class LLMCache:
+    """基于 SQLite 的 AI 响应缓存 (线程安全，读写失败时静默降级为未命中)"""
+
+    def __init__(self, path=LLM_CACHE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self):
+        """懒加载数据库连接"""
+        if self._conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, response TEXT, ts INTEGER)")
+            self._conn = conn
+        return self._conn
+
+    def get(self, key):
+        """读取缓存，未命中返回 None"""
+        with self._lock:
+            try:
+                row = self._connect().execute("SELECT response FROM cache WHERE key = ?", (key,)).fetchone()
+            except sqlite3.Error:
+                return None
+        return row[0] if row else None
+
+    def set(self, key, response):
+        """写入缓存"""
+        with self._lock:
+            try:
+                conn = self._connect()
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (key, response, ts) VALUES (?, ?, ?)",
+                    (key, response, int(time.time()))
+                )
+                conn.commit()
+            except sqlite3.Error:
+                pass
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
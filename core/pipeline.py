@@ -5,40 +5,112 @@ import asyncio
 import os
 import sys
 import json
+import orjson
 import re
 import shutil
-import glob
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from playwright.async_api import async_playwright
 import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 import httpx
-from bs4 import BeautifulSoup
+try:
+    import h2  # noqa: F401  httpx 的 HTTP/2 支持依赖 h2 (httpx[http2])
+    HTTP2_ENABLED = True
+except ImportError:
+    HTTP2_ENABLED = False
+from selectolax.lexbor import LexborHTMLParser
 
 # 添加父目录到路径，以便导入核心模块
 try:
-    from .xhs_core import XHSGenerator
+    from .xhs_core import XHSGenerator, render_cover_job, render_body_page_job
     from .config_manager import ConfigManager
+    from .llm_cache import LLMCache, make_cache_key
 except ImportError:
     # 尝试直接导入 (兼容 old style)
     try:
-        from xhs_core import XHSGenerator
+        from xhs_core import XHSGenerator, render_cover_job, render_body_page_job
         from config_manager import ConfigManager
+        from llm_cache import LLMCache, make_cache_key
     except ImportError:
         # 尝试从 core 导入 (兼容 root execution)
-        from core.xhs_core import XHSGenerator
+        from core.xhs_core import XHSGenerator, render_cover_job, render_body_page_job
         from core.config_manager import ConfigManager
+        from core.llm_cache import LLMCache, make_cache_key
 
 # ================== 常量 ==================
 PARENT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 USER_DATA_DIR = os.path.join(PARENT_DIR, "xhs_browser_data")
+STORAGE_STATE_PATH = os.path.join(USER_DATA_DIR, "storage_state.json")  # 抓取用的 Cookie/LocalStorage
 LOGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "logs")
 ARCHIVES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "archives")
+TEMP_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_output")
 
 # 确保目录存在
 os.makedirs(LOGS_DIR, exist_ok=True)
 os.makedirs(ARCHIVES_DIR, exist_ok=True)
 
+BROWSER_ARGS = ["--disable-blink-features=AutomationControlled", "--disable-notifications"]
+VIEWPORT = {'width': 1280, 'height': 800}
+XHS_CREATOR_ORIGIN = "https://creator.xiaohongshu.com"
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+}
+
+# 预编译正则
+_EMOJI_RE = re.compile(r'[\U00010000-\U0010ffff\u2600-\u26ff\u2700-\u27bf\ufe00-\ufe0f\u2300-\u23ff\u200d\u2b50]')
+_UNSAFE_FS_RE = re.compile(r'[\\/:*?"<>|]')
+_TOKEN_RE = re.compile(r'[A-Za-z]+|[^\sA-Za-z]')  # 标题分词：连续英文字母 / 单个非空白字符
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def _extract_json(txt):
+    """从 AI 返回中提取 JSON：优先 ``` 代码块，否则从第一个 { 开始解码
+    
+    raw_decode 在对象结束处自动停止，无需查找结束的 ```，也不产生任何子串拷贝。
+    """
+    fence = txt.find("```")
+    start = txt.find('{', fence + 3) if fence >= 0 else -1
+    if start < 0:
+        start = txt.find('{')
+    if start >= 0:
+        return _JSON_DECODER.raw_decode(txt, start)[0]
+    return orjson.loads(txt)
+
+# AI 响应缓存 (进程内共享一个连接)
+llm_cache = LLMCache()
+
+# 渲染进程池 (进程内共享，首次使用时创建)
+# 常驻复用：子进程只在第一次渲染时导入模块、加载字体，之后的渲染直接复用其中的字体/底图缓存
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def _get_render_pool():
+    """获取共享渲染进程池"""
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            # spawn：调用方通常在工作线程中，fork 多线程进程有死锁风险
+            _render_pool = ProcessPoolExecutor(max_workers=os.cpu_count() or 1, mp_context=multiprocessing.get_context("spawn"))
+        return _render_pool
+
+
+def _reset_render_pool():
+    """丢弃已损坏的进程池，下次使用时重建"""
+    global _render_pool
+    with _render_pool_lock:
+        pool, _render_pool = _render_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
 
 class Logger:
     """日志管理器"""
@@ -46,6 +118,8 @@ class Logger:
         self.callback = callback  # GUI 回调
         self.logs = []
         self.log_file = os.path.join(LOGS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}.log")
+        self._fh = None  # 日志文件句柄 (首次写入时打开，行缓冲)
+        self._fh_lock = threading.Lock()
     
     def log(self, message, level="INFO"):
         timestamp = datetime.now().strftime("%H:%M:%S")
@@ -53,8 +127,10 @@ class Logger:
         self.logs.append(full_msg)
         
         # 写入文件
-        with open(self.log_file, 'a', encoding='utf-8') as f:
-            f.write(full_msg + "\n")
+        with self._fh_lock:
+            if self._fh is None:
+                self._fh = open(self.log_file, 'a', encoding='utf-8', buffering=1)
+            self._fh.write(full_msg + "\n")
         
         # GUI 回调
         if self.callback:
@@ -62,6 +138,13 @@ class Logger:
         else:
             print(full_msg)
     
+    def close(self):
+        """关闭日志文件 (之后再写日志会自动重新打开)"""
+        with self._fh_lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+    
     async def save_screenshot(self, page, name):
         """保存错误截图"""
         path = os.path.join(LOGS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{name}.png")
@@ -73,9 +156,78 @@ class Logger:
             return None
 
 
+class BrowserSession:
+    """共享的 Playwright 浏览器
+
+    浏览器进程懒启动并常驻，每个任务 (抓取/发布) 只创建独立的 BrowserContext，
+    用完关闭 context 即可，避免每次都冷启动 Chromium。
+    """
+    def __init__(self):
+        self._playwright = None
+        self._browser = None
+        self._headless = None
+        self._proxy = None
+        self._lock = asyncio.Lock()
+    
+    async def get(self, headless=False, proxy=None):
+        """获取浏览器实例 (headless 模式或代理变化时重启)"""
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected() \
+                    and self._headless == headless and self._proxy == proxy:
+                return self._browser
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except:
+                    pass
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+                await self._export_legacy_profile()
+            # 与原持久化上下文一致，使用本机安装的 Chrome (而非 Playwright 自带的 Chromium)
+            self._browser = await self._playwright.chromium.launch(
+                headless=headless, channel="chrome", args=BROWSER_ARGS,
+                proxy={"server": proxy} if proxy else None
+            )
+            self._headless = headless
+            self._proxy = proxy
+            return self._browser
+    
+    async def _export_legacy_profile(self):
+        """一次性迁移: 把旧版持久化用户目录中的登录态导出为 storage_state 文件"""
+        if os.path.exists(STORAGE_STATE_PATH) or not os.path.isdir(os.path.join(USER_DATA_DIR, "Default")):
+            return
+        try:
+            context = await self._playwright.chromium.launch_persistent_context(
+                user_data_dir=USER_DATA_DIR, headless=True, channel="chrome", args=BROWSER_ARGS
+            )
+            try:
+                await context.storage_state(path=STORAGE_STATE_PATH)
+            finally:
+                await context.close()
+        except:
+            pass
+    
+    async def close(self):
+        """关闭浏览器和 Playwright 驱动"""
+        async with self._lock:
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except:
+                    pass
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+
 class PublishPipeline:
     """发布流水线"""
     
+    # Gemini SDK 状态 (进程内所有流水线共享)
+    _genai_api_key = None
+    _model_cache = {}
+    
     def __init__(self, config_manager: ConfigManager, logger: Logger = None):
         self.config = config_manager
         self.logger = logger or Logger()
@@ -87,6 +239,76 @@ class PublishPipeline:
         self.image_paths = []
         self.archive_dir = None
         self.image_template = 'breath'  # 默认图文模板
+        self._render_dirs = []  # 本流水线创建的临时渲染目录 (cleanup() 时删除)
+        self._pending = []  # 后台任务 (归档等)，关闭前等待完成
+        self._prompt_memo = None  # (模板, url, 原文) -> 拼装好的提示词
+        
+        # 共享浏览器 / HTTP 连接池 (懒启动，用完需调用 aclose() 释放)
+        self.browser = BrowserSession()
+        self._http = None
+        self._http_proxy = None
+        self._owns_resources = True
+    
+    def _proxy_url(self):
+        """当前配置的代理地址 (配置管理器未提供代理设置时返回 None，沿用系统环境变量)"""
+        get_proxy_url = getattr(self.config, "get_proxy_url", None)
+        return get_proxy_url() if get_proxy_url else None
+    
+    def _ensure_http(self):
+        """懒加载 HTTP 客户端 (复用连接，多次抓取免去重复的 DNS/TLS 握手；代理变化时重建)"""
+        if not self._owns_resources:
+            # 子流水线使用父流水线的连接池，不能自行关闭或重建
+            return self._http
+        proxy = self._proxy_url()
+        if self._http is not None and self._http_proxy != proxy:
+            self._pending.append(asyncio.ensure_future(self._http.aclose()))
+            self._http = None
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                http2=HTTP2_ENABLED,
+                timeout=30,
+                follow_redirects=True,
+                headers=HTTP_HEADERS,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+                proxy=proxy,
+            )
+            self._http_proxy = proxy
+        return self._http
+    
+    async def close_sessions(self):
+        """等待后台任务结束，关闭浏览器和 HTTP 连接池 (均绑定当前事件循环)，渲染结果保留"""
+        if self._pending:
+            pending, self._pending = self._pending, []
+            await asyncio.gather(*pending, return_exceptions=True)
+        if self._owns_resources:
+            await self.browser.close()
+            if self._http is not None:
+                await self._http.aclose()
+                self._http = None
+    
+    def cleanup(self):
+        """删除本流水线创建的临时渲染目录"""
+        for path in self._render_dirs:
+            shutil.rmtree(path, ignore_errors=True)
+        self._render_dirs = []
+    
+    async def aclose(self):
+        """释放流水线持有的全部资源 (浏览器、HTTP 连接池、日志文件、临时图片)"""
+        await self.close_sessions()
+        if self._owns_resources:
+            # 子流水线与父流水线共用日志器，由父流水线负责关闭
+            self.logger.close()
+        self.cleanup()
+    
+    def reset_run_state(self):
+        """清空上一次运行的数据和临时图片，浏览器/HTTP 连接保留供下一次运行复用"""
+        self.scraped_data = None
+        self.ai_data = None
+        self.image_paths = []
+        self.archive_dir = None
+        self._prompt_memo = None
+        self.logger.logs = []
+        self.cleanup()
     
     def set_progress_callback(self, callback):
         self.progress_callback = callback
@@ -101,87 +323,82 @@ class PublishPipeline:
         self.logger.log(f"🕷️ 正在抓取: {url}")
         self.update_progress(10)
         
-        async with async_playwright() as p:
-            context = await p.chromium.launch_persistent_context(
-                user_data_dir=USER_DATA_DIR,
-                headless=headless,
-                channel="chrome",
-                viewport={'width': 1280, 'height': 800},
-                args=["--disable-blink-features=AutomationControlled"]
-            )
-            page = context.pages[0]
+        browser = await self.browser.get(headless=headless, proxy=self._proxy_url())
+        # 复用上次保存的登录态 (替代原来的持久化用户目录)
+        storage_state = STORAGE_STATE_PATH if os.path.exists(STORAGE_STATE_PATH) else None
+        context = await browser.new_context(viewport=VIEWPORT, storage_state=storage_state)
+        page = await context.new_page()
+        
+        try:
+            await page.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            await page.goto(url, timeout=60000)
+            await page.wait_for_timeout(3000)
+            
+            title = await page.title()
+            content = await page.evaluate("""() => {
+                document.querySelectorAll('script, style, nav, footer, iframe').forEach(e => e.remove());
+                return document.body.innerText;
+            }""")
+            
+            self.scraped_data = {
+                "title": title,
+                "url": url,
+                "full_text": content[:15000]
+            }
+            
+            self.logger.log(f"✅ 抓取成功: {title[:30]}... ({len(content)}字)")
+            self.update_progress(25)
             
             try:
-                await page.add_init_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
-                await page.goto(url, timeout=60000)
-                await page.wait_for_timeout(3000)
-                
-                title = await page.title()
-                content = await page.evaluate("""() => {
-                    document.querySelectorAll('script, style, nav, footer, iframe').forEach(e => e.remove());
-                    return document.body.innerText;
-                }""")
-                
-                self.scraped_data = {
-                    "title": title,
-                    "url": url,
-                    "full_text": content[:15000]
-                }
-                
-                self.logger.log(f"✅ 抓取成功: {title[:30]}... ({len(content)}字)")
-                self.update_progress(25)
-                return self.scraped_data
-                
-            except Exception as e:
-                self.logger.log(f"❌ 抓取失败: {e}")
-                await self.logger.save_screenshot(page, "scrape_error")
-                return None
-            finally:
-                await context.close()
+                os.makedirs(USER_DATA_DIR, exist_ok=True)
+                await context.storage_state(path=STORAGE_STATE_PATH)
+            except:
+                pass
+            return self.scraped_data
+            
+        except Exception as e:
+            self.logger.log(f"❌ 抓取失败: {e}")
+            await self.logger.save_screenshot(page, "scrape_error")
+            return None
+        finally:
+            await context.close()
     
     async def scrape_lightweight(self, url):
         """轻量级 HTTP 抓取 (用于云端环境，不需要浏览器)"""
         self.logger.log(f"🌐 [轻量模式] 正在抓取: {url}")
         self.update_progress(10)
         
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
-            'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-        }
-        
         try:
-            async with httpx.AsyncClient(timeout=30, follow_redirects=True) as client:
-                response = await client.get(url, headers=headers)
-                response.raise_for_status()
-                
-                soup = BeautifulSoup(response.text, 'html.parser')
-                
-                # 移除不需要的元素
-                for tag in soup.find_all(['script', 'style', 'nav', 'footer', 'iframe', 'noscript']):
-                    tag.decompose()
-                
-                # 提取标题
-                title = soup.title.string if soup.title else "未知标题"
-                
-                # 提取正文
-                # 微信公众号特定选择器
-                article = soup.find('div', id='js_content') or soup.find('div', class_='rich_media_content')
-                if article:
-                    content = article.get_text(separator='\n', strip=True)
-                else:
-                    content = soup.body.get_text(separator='\n', strip=True) if soup.body else ""
-                
-                self.scraped_data = {
-                    "title": title.strip() if title else "未知标题",
-                    "url": url,
-                    "full_text": content[:15000]
-                }
-                
-                self.logger.log(f"✅ [轻量模式] 抓取成功: {self.scraped_data['title'][:30]}... ({len(content)}字)")
-                self.update_progress(25)
-                return self.scraped_data
-                
+            response = await self._ensure_http().get(url)
+            response.raise_for_status()
+            
+            tree = LexborHTMLParser(response.text)
+            
+            # 移除不需要的元素
+            for node in tree.css('script, style, nav, footer, iframe, noscript'):
+                node.decompose()
+            
+            # 提取标题
+            title_node = tree.css_first('title')
+            title = title_node.text() if title_node else "未知标题"
+            
+            # 提取正文
+            # 微信公众号特定选择器
+            article = tree.css_first('div#js_content') or tree.css_first('div.rich_media_content') or tree.body
+            content = article.text(separator='\n', strip=True) if article else ""
+            # 去掉空文本节点留下的空行
+            content = '\n'.join(line for line in content.split('\n') if line)
+            
+            self.scraped_data = {
+                "title": title.strip() if title else "未知标题",
+                "url": url,
+                "full_text": content[:15000]
+            }
+            
+            self.logger.log(f"✅ [轻量模式] 抓取成功: {self.scraped_data['title'][:30]}... ({len(content)}字)")
+            self.update_progress(25)
+            return self.scraped_data
+            
         except httpx.HTTPStatusError as e:
             self.logger.log(f"❌ HTTP 错误: {e.response.status_code}")
             return None
@@ -190,8 +407,8 @@ class PublishPipeline:
             return None
     
     # ================== 2. AI 生成模块 ==================
-    def generate_content(self, prompt_template):
-        """调用 Gemini 生成内容"""
+    async def generate_content(self, prompt_template):
+        """调用 Gemini 生成内容 (异步请求，等待期间不阻塞事件循环)"""
         if not self.scraped_data:
             self.logger.log("❌ 没有抓取数据")
             return None
@@ -210,51 +427,25 @@ class PublishPipeline:
         self.logger.log(f"🧠 AI 正在思考 (模型: {model_name})...")
         self.update_progress(35)
         
-        genai.configure(api_key=api_key)
-        
-        user_prompt = prompt_template.format(
-            url=self.scraped_data['url'],
-            full_text=self.scraped_data['full_text']
-        )
-        
         safety_settings = {HarmCategory.HARM_CATEGORY_HATE_SPEECH: HarmBlockThreshold.BLOCK_NONE}
         
+        # 相同模型 + 模板 + 原文直接复用上次的返回
+        cache_key = make_cache_key(model_name, prompt_template, self.scraped_data['full_text'])
+        txt = None
+        
         try:
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(user_prompt, safety_settings=safety_settings)
-            
-            txt = response.text
+            txt = llm_cache.get(cache_key)
+            if txt is not None:
+                self.logger.log("⚡ 命中 AI 缓存，跳过模型调用")
+            else:
+                model = self._get_model(api_key, model_name)
+                user_prompt = self._build_prompt(prompt_template)
+                response = await model.generate_content_async(user_prompt, safety_settings=safety_settings)
+                txt = response.text
             self.logger.log(f"📄 AI 返回 {len(txt)} 字符")
             
-            # 多种方式提取 JSON
-            json_str = None
-            
-            # 方式1: ```json ... ```
-            if "```json" in txt:
-                try:
-                    json_str = txt.split("```json")[1].split("```")[0].strip()
-                except:
-                    pass
-            
-            # 方式2: ``` ... ```
-            if not json_str and "```" in txt:
-                try:
-                    json_str = txt.split("```")[1].split("```")[0].strip()
-                except:
-                    pass
-            
-            # 方式3: 直接查找 { ... }
-            if not json_str:
-                match = re.search(r'\{[\s\S]*\}', txt)
-                if match:
-                    json_str = match.group(0)
-            
-            # 方式4: 直接使用原文
-            if not json_str:
-                json_str = txt.strip()
-            
-            # 尝试解析
-            self.ai_data = json.loads(json_str)
+            # 解析 JSON (代码块 / 裸 JSON 一次扫描)
+            self.ai_data = _extract_json(txt)
             
             # 验证必需字段
             if 'cover_title' not in self.ai_data:
@@ -264,6 +455,9 @@ class PublishPipeline:
                 self.logger.log("⚠️ 缺少 content_body 字段")
                 return None
             
+            # 只缓存解析成功的结果，避免坏响应被反复命中
+            llm_cache.set(cache_key, txt)
+            
             self.logger.log(f"✅ 内容生成成功: {self.ai_data.get('cover_title', 'No Title')[:20]}")
             self.update_progress(50)
             return self.ai_data
@@ -277,22 +471,122 @@ class PublishPipeline:
             return None
 
     
+    @classmethod
+    def _get_model(cls, api_key, model_name):
+        """获取 Gemini 模型实例 (按 API Key + 模型名缓存，Key 变化时才重新 configure)"""
+        if api_key != cls._genai_api_key:
+            genai.configure(api_key=api_key)
+            cls._genai_api_key = api_key
+        model = cls._model_cache.get((api_key, model_name))
+        if model is None:
+            model = genai.GenerativeModel(model_name)
+            cls._model_cache[(api_key, model_name)] = model
+        return model
+    
+    def _build_prompt(self, prompt_template):
+        """拼装完整提示词 (按 模板 + 抓取数据 记忆，重复生成时不再重新拼接)
+        
+        模板中的 {url}/{full_text} 均位于末尾，静态指令构成稳定前缀，可命中 Gemini 的隐式前缀缓存；
+        模板仅 1~2K 字符，达不到显式 CachedContent 的最小 token 数，因此不单独创建缓存。
+        """
+        memo_key = (prompt_template, self.scraped_data['url'], self.scraped_data['full_text'])
+        if self._prompt_memo is None or self._prompt_memo[0] != memo_key:
+            user_prompt = prompt_template.format(
+                url=self.scraped_data['url'],
+                full_text=self.scraped_data['full_text']
+            )
+            self._prompt_memo = (memo_key, user_prompt)
+        return self._prompt_memo[1]
+    
     # ================== 3. 渲染模块 ==================
     def render_images(self, output_dir=None):
         """渲染小红书图片"""
+        prepared = self._prepare_render(output_dir)
+        if not prepared:
+            return []
+        
+        try:
+            # 封面 + 各正文页并行绘制，直接使用返回的路径 (已按页序排列，无需再扫描目录)
+            self.image_paths = self._render_pages(*prepared)
+            
+            self.logger.log(f"✅ 渲染完成，共 {len(self.image_paths)} 张图片")
+            self.update_progress(75)
+            return self.image_paths
+            
+        except Exception as e:
+            self.logger.log(f"❌ 渲染失败: {e}")
+            return []
+    
+    async def render_images_iter(self, output_dir=None):
+        """渲染小红书图片，按页序逐张产出路径 (每张画完立即可用，无需等待全部完成)"""
+        prepared = await asyncio.to_thread(self._prepare_render, output_dir)
+        if not prepared:
+            return
+        generator, title, pages = prepared
+        args = (generator.template_name, generator.header_text, generator.footer_text, generator.output_dir)
+        jobs = [(render_cover_job, (*args, title))]
+        jobs += [(render_body_page_job, (*args, items, page_num)) for page_num, items in enumerate(pages, 1)]
+        
+        paths = []
+        submitted = []  # 已提交到进程池的任务 (中途失败或提前退出时取消其余页)
+        try:
+            futures = None
+            if min(len(jobs), os.cpu_count() or 1) > 1:
+                try:
+                    pool = _get_render_pool()
+                    for func, job_args in jobs:
+                        submitted.append(pool.submit(func, *job_args))
+                    futures = submitted
+                except (OSError, BrokenProcessPool) as e:
+                    _reset_render_pool()
+                    self.logger.log(f"⚠️ 多进程渲染不可用，改为单进程: {e}")
+            
+            for i, (func, job_args) in enumerate(jobs):
+                path = None
+                if futures:
+                    try:
+                        path = await asyncio.wrap_future(futures[i])
+                    except (OSError, BrokenProcessPool) as e:
+                        _reset_render_pool()
+                        futures = None
+                        self.logger.log(f"⚠️ 多进程渲染不可用，改为单进程: {e}")
+                if path is None:
+                    path = await asyncio.to_thread(func, *job_args)
+                paths.append(path)
+                yield path
+        except Exception as e:
+            self.logger.log(f"❌ 渲染失败: {e}")
+            return
+        finally:
+            for fut in submitted:
+                fut.cancel()
+        
+        self.image_paths = paths
+        self.logger.log(f"✅ 渲染完成，共 {len(paths)} 张图片")
+        self.update_progress(75)
+    
+    def _prepare_render(self, output_dir=None):
+        """准备渲染：建输出目录、清洗标题和正文并分页，返回 (generator, 标题, 正文分页)，失败返回 None"""
         if not self.ai_data:
             self.logger.log("❌ 没有 AI 数据")
-            return []
+            return None
         
         self.logger.log("🎨 正在渲染图片...")
         self.update_progress(60)
         
-        if not output_dir:
-            output_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_output")
+        # 重新渲染时，上一次的图片作废
+        self.image_paths = []
+        self.cleanup()
         
-        if os.path.exists(output_dir):
-            shutil.rmtree(output_dir)
-        os.makedirs(output_dir)
+        if output_dir:
+            if os.path.exists(output_dir):
+                shutil.rmtree(output_dir)
+            os.makedirs(output_dir)
+        else:
+            # 每个任务独立的临时目录，并发任务互不干扰
+            os.makedirs(TEMP_OUTPUT_DIR, exist_ok=True)
+            output_dir = tempfile.mkdtemp(prefix='xhs_render_', dir=TEMP_OUTPUT_DIR)
+            self._render_dirs.append(output_dir)
         
         try:
             template_name = getattr(self, 'image_template', 'breath') or 'breath'
@@ -307,34 +601,38 @@ class PublishPipeline:
             raw_title = self.ai_data['cover_title'].replace("\\n", "\n")
             clean_title = self._remove_emojis(raw_title)
             clean_title = self._smart_wrap_title(clean_title)
-            generator.generate_cover(clean_title)
             
-            # 清洗正文
+            # 清洗正文并分页 (排版很快，在本进程完成)
             clean_body = self._remove_emojis(self.ai_data['content_body'])
-            generator.generate_body(clean_body)
-            
-            # 收集图片
-            self.image_paths = []
-            cover_path = os.path.join(output_dir, "01_cover.png")
-            if os.path.exists(cover_path):
-                self.image_paths.append(cover_path)
-            
-            body_files = glob.glob(os.path.join(output_dir, "02_body_*.png"))
-            body_files.sort(key=lambda x: int(re.search(r'body_(\d+)', x).group(1)))
-            self.image_paths.extend(body_files)
-            
-            self.logger.log(f"✅ 渲染完成，共 {len(self.image_paths)} 张图片")
-            self.update_progress(75)
-            return self.image_paths
-            
+            pages = generator.layout_body(clean_body)
         except Exception as e:
             self.logger.log(f"❌ 渲染失败: {e}")
-            return []
+            return None
+        return generator, clean_title, pages
+    
+    def _render_pages(self, generator, title, pages):
+        """多进程并行渲染封面和正文页 (绘制 + PNG 编码是 CPU 密集型，线程受 GIL 限制)，返回按页序排列的路径"""
+        workers = min(len(pages) + 1, os.cpu_count() or 1)
+        if workers > 1:
+            args = (generator.template_name, generator.header_text, generator.footer_text, generator.output_dir)
+            try:
+                pool = _get_render_pool()
+                futures = [pool.submit(render_cover_job, *args, title)]
+                futures += [pool.submit(render_body_page_job, *args, items, page_num)
+                            for page_num, items in enumerate(pages, 1)]
+                return [future.result() for future in futures]
+            except (OSError, BrokenProcessPool) as e:
+                _reset_render_pool()
+                self.logger.log(f"⚠️ 多进程渲染不可用，改为单进程: {e}")
+        
+        paths = [generator.generate_cover(title)]
+        paths += [generator.render_body_page(items, page_num) for page_num, items in enumerate(pages, 1)]
+        return paths
     
     def _remove_emojis(self, text):
         if not text:
             return ""
-        return re.sub(r'[\U00010000-\U0010ffff\u2600-\u26ff\u2700-\u27bf\ufe00-\ufe0f\u2300-\u23ff\u200d\u2b50]', '', text).strip()
+        return _EMOJI_RE.sub('', text).strip()
     
     def _smart_wrap_title(self, title, max_chars_per_line=7, max_lines=3):
         """
@@ -346,60 +644,32 @@ class PublishPipeline:
         if not title:
             return title
         
+        # 短标题且不含空白：一行放得下，无需分词
+        if len(title) <= max_chars_per_line and title.split() == [title]:
+            return title
+        
         # 如果已有换行且格式合理，保持原样
         existing_lines = title.split('\n')
         all_ok = all(len(line.strip()) <= max_chars_per_line + 3 for line in existing_lines if line.strip())
         if len(existing_lines) > 1 and all_ok:
             return title
         
-        # 合并所有文字
-        full_text = title.replace('\n', '')
+        # 合并所有文字，智能分词：英文单词作为整体，其余非空白字符各自成词
+        tokens = _TOKEN_RE.findall(title)
         
-        # 智能分词：将英文单词作为整体
-        tokens = []
-        current_word = ''
-        for char in full_text:
-            if char.isascii() and char.isalpha():
-                current_word += char
-            else:
-                if current_word:
-                    tokens.append(current_word)
-                    current_word = ''
-                if char.strip():  # 非空白字符
-                    tokens.append(char)
-        if current_word:
-            tokens.append(current_word)
-        
-        # 按行分配
+        # 贪心按行分配，最后一行放剩余所有内容
         lines = []
         current_line = ''
-        current_len = 0
-        
         for token in tokens:
-            token_len = len(token) if not token.isascii() else len(token)
-            
-            if current_len + token_len <= max_chars_per_line:
-                current_line += token
-                current_len += token_len
-            else:
-                if current_line:
-                    lines.append(current_line)
+            if len(lines) < max_lines - 1 and current_line and len(current_line) + len(token) > max_chars_per_line:
+                lines.append(current_line)
                 current_line = token
-                current_len = token_len
-                
-                if len(lines) >= max_lines - 1:
-                    # 最后一行放剩余所有内容
-                    break
+            else:
+                current_line += token
         
         if current_line:
             lines.append(current_line)
         
-        # 如果还有剩余 token，追加到最后一行
-        remaining_idx = sum(len(l.replace(' ', '')) for l in lines)
-        remaining = ''.join(tokens)[remaining_idx:]
-        if remaining and lines:
-            lines[-1] += remaining
-        
         return '\n'.join(lines[:max_lines])
     
     # ================== 4. 发布模块 ==================
@@ -415,236 +685,242 @@ class PublishPipeline:
         title = self.ai_data.get('caption_title', '未命名')
         content = self.ai_data['content_body'].replace("## ", "").replace("**", "")
         
-        async with async_playwright() as p:
-            # 云端模式强制使用 headless
-            actual_headless = headless and auto_publish
+        # 云端模式强制使用 headless
+        actual_headless = headless and auto_publish
+        
+        # 使用标准浏览器上下文 (兼容 GitHub Actions)
+        browser = await self.browser.get(headless=actual_headless, proxy=self._proxy_url())
+        context = await browser.new_context(viewport=VIEWPORT)
+        
+        # --- Cookie 注入逻辑 (GitHub Actions 专用) ---
+        xhs_cookie_str = self.config.get("xhs_cookie")
+        if xhs_cookie_str:
+            self.logger.log("🍪 检测到 Cookie 配置，正在注入...")
+            # 解析 Cookie 字符串 (name=value; name2=value2)
+            cookies = []
+            try:
+                for item in xhs_cookie_str.split(';'):
+                    if '=' in item:
+                        name, value = item.strip().split('=', 1)
+                        cookies.append({
+                            "name": name,
+                            "value": value,
+                            "domain": ".xiaohongshu.com",
+                            "path": "/"
+                        })
+                await context.add_cookies(cookies)
+                self.logger.log(f"✅ 成功注入 {len(cookies)} 个 Cookie")
+            except Exception as e:
+                 self.logger.log(f"⚠️ Cookie 注入失败: {e}")
+        # -------------------------------------------
+
+        page = await context.new_page()
+        
+        try:
+            # 访问发布页
+            self.logger.log("🌐 前往小红书创作中心...")
+            await page.goto(f"{XHS_CREATOR_ORIGIN}/publish/publish", timeout=60000)
             
-            # 使用标准浏览器上下文 (兼容 GitHub Actions)
-            browser = await p.chromium.launch(
-                headless=actual_headless,
-                args=["--disable-blink-features=AutomationControlled", "--disable-notifications"]
-            )
-            context = await browser.new_context(
-                viewport={'width': 1280, 'height': 800}
-            )
+            # 登录检测
+            try:
+                await page.wait_for_selector(".creator-container", timeout=15000)
+            except:
+                self.logger.log("⚠️ 需要登录，请扫码...")
+                await self.logger.save_screenshot(page, "need_login")
+                await page.wait_for_url("**/publish/publish**", timeout=120000)
             
-            # --- Cookie 注入逻辑 (GitHub Actions 专用) ---
-            xhs_cookie_str = self.config.get("xhs_cookie")
-            if xhs_cookie_str:
-                self.logger.log("🍪 检测到 Cookie 配置，正在注入...")
-                # 解析 Cookie 字符串 (name=value; name2=value2)
-                cookies = []
-                try:
-                    for item in xhs_cookie_str.split(';'):
-                        if '=' in item:
-                            name, value = item.strip().split('=', 1)
-                            cookies.append({
-                                "name": name,
-                                "value": value,
-                                "domain": ".xiaohongshu.com",
-                                "path": "/"
-                            })
-                    await context.add_cookies(cookies)
-                    self.logger.log(f"✅ 成功注入 {len(cookies)} 个 Cookie")
-                except Exception as e:
-                     self.logger.log(f"⚠️ Cookie 注入失败: {e}")
-            # -------------------------------------------
-
-            page = await context.new_page()
+            await page.wait_for_timeout(3000)
+            await page.keyboard.press("Escape")
+            
+            # 切换图文模式
+            self.logger.log("🔄 切换图文模式...")
+            await page.evaluate("""() => {
+                const allElements = document.querySelectorAll('*');
+                for (const el of allElements) {
+                    if (el.innerText && el.innerText.trim() === '上传图文' && el.offsetParent !== null) {
+                        el.click();
+                        if(el.parentElement) el.parentElement.click();
+                    }
+                }
+            }""")
+            await page.wait_for_timeout(2000)
             
+            # 上传图片
+            self.logger.log(f"📤 上传 {len(self.image_paths)} 张图片...")
             try:
-                # 访问发布页
-                self.logger.log("🌐 前往小红书创作中心...")
-                await page.goto("https://creator.xiaohongshu.com/publish/publish", timeout=60000)
-                
-                # 登录检测
-                try:
-                    await page.wait_for_selector(".creator-container", timeout=15000)
-                except:
-                    self.logger.log("⚠️ 需要登录，请扫码...")
-                    await self.logger.save_screenshot(page, "need_login")
-                    await page.wait_for_url("**/publish/publish**", timeout=120000)
-                
+                async with page.expect_file_chooser(timeout=10000) as fc_info:
+                    await page.locator("text=上传图片 >> visible=true").first.click()
+                file_chooser = await fc_info.value
+                # 传文件路径而非内存 buffer：本地浏览器直接按路径读取，buffer 反而要 base64 后经管道传给驱动
+                await file_chooser.set_files(self.image_paths)
+                self.logger.log("✅ 图片上传成功")
+            except Exception as e:
+                self.logger.log(f"⚠️ 图片上传异常: {e}")
+            
+            await page.wait_for_timeout(8000)
+            
+            # 填写标题
+            self.logger.log("✍️ 填写标题...")
+            try:
+                await page.locator("input[placeholder*='标题']").first.fill(title)
+            except:
+                await page.locator("input.el-input__inner").first.fill(title)
+            
+            # 填写正文
+            self.logger.log("✍️ 填写正文...")
+            editor = page.locator(".ProseMirror")
+            if await editor.count() > 0:
+                await editor.click()
+                await self._paste_text(context, page, editor, content)
+            
+            # 自动选择推荐标签
+            self.logger.log("🏷️ 自动选择标签...")
+            await page.wait_for_timeout(2000)
+            try:
+                for i in range(5):  # 点击5个标签
+                    # 定位第一个可见的 # 开头的标签
+                    tag_selector = ".tag-group > span.tag"
+                    tags = page.locator(tag_selector)
+                    count = await tags.count()
+                    
+                    if count > 0:
+                        first_tag = tags.first
+                        if await first_tag.is_visible():
+                            text = await first_tag.inner_text()
+                            if text.startswith('#') and '展开' not in text:
+                                self.logger.log(f"   👉 选择: {text}")
+                                await first_tag.click()
+                                await page.wait_for_timeout(1500)  # 等待列表刷新
+            except Exception as e:
+                self.logger.log(f"⚠️ 标签选择异常: {e}")
+            
+            self.update_progress(90)
+            
+            # 发布或手动
+            if auto_publish:
+                self.logger.log("🚀 点击发布...")
                 await page.wait_for_timeout(3000)
-                await page.keyboard.press("Escape")
-                
-                # 切换图文模式
-                self.logger.log("🔄 切换图文模式...")
-                await page.evaluate("""() => {
-                    const allElements = document.querySelectorAll('*');
-                    for (const el of allElements) {
-                        if (el.innerText && el.innerText.trim() === '上传图文' && el.offsetParent !== null) {
-                            el.click();
-                            if(el.parentElement) el.parentElement.click();
-                        }
-                    }
-                }""")
-                await page.wait_for_timeout(2000)
-                
-                # 上传图片
-                self.logger.log(f"📤 上传 {len(self.image_paths)} 张图片...")
-                try:
-                    async with page.expect_file_chooser(timeout=10000) as fc_info:
-                        buttons = await page.locator("div, button, span").filter(has_text="上传图片").all()
-                        for btn in buttons:
-                            if await btn.is_visible():
-                                await btn.click()
-                                break
-                    file_chooser = await fc_info.value
-                    await file_chooser.set_files(self.image_paths)
-                    self.logger.log("✅ 图片上传成功")
-                except Exception as e:
-                    self.logger.log(f"⚠️ 图片上传异常: {e}")
                 
-                await page.wait_for_timeout(8000)
+                # 尝试多种选择器查找发布按钮：合并成一个选择器列表只等待一次，出现后再按优先级挑选
+                btn = None
+                selectors = [
+                    "button.publishBtn",
+                    "button:has-text('发布')",
+                    ".publish-btn",
+                    "button.css-1gl8z4q",  # 备用类名
+                    "[class*='publish']"
+                ]
                 
-                # 填写标题
-                self.logger.log("✍️ 填写标题...")
                 try:
-                    await page.locator("input[placeholder*='标题']").first.fill(title)
+                    any_visible = ", ".join(f"{sel}:visible" for sel in selectors)
+                    await page.locator(any_visible).first.wait_for(state="visible", timeout=10000)
+                    for sel in selectors:
+                        candidate = page.locator(f"{sel}:visible").first
+                        if await candidate.count() > 0:
+                            btn = candidate
+                            self.logger.log(f"✅ 找到发布按钮: {sel}")
+                            break
                 except:
-                    await page.locator("input.el-input__inner").first.fill(title)
-                
-                # 填写正文
-                self.logger.log("✍️ 填写正文...")
-                editor = page.locator(".ProseMirror")
-                if await editor.count() > 0:
-                    await editor.click()
-                    await page.keyboard.type(content, delay=30)
+                    pass
                 
-                # 自动选择推荐标签
-                self.logger.log("🏷️ 自动选择标签...")
-                await page.wait_for_timeout(2000)
+                if btn is None:
+                    self.logger.log("❌ 找不到发布按钮")
+                    await self.logger.save_screenshot(page, "no_publish_btn")
+                    return False
                 try:
-                    for i in range(5):  # 点击5个标签
-                        # 定位第一个可见的 # 开头的标签
-                        tag_selector = ".tag-group > span.tag"
-                        tags = page.locator(tag_selector)
-                        count = await tags.count()
-                        
-                        if count > 0:
-                            first_tag = tags.first
-                            if await first_tag.is_visible():
-                                text = await first_tag.inner_text()
-                                if text.startswith('#') and '展开' not in text:
-                                    self.logger.log(f"   👉 选择: {text}")
-                                    await first_tag.click()
-                                    await page.wait_for_timeout(1500)  # 等待列表刷新
-                except Exception as e:
-                    self.logger.log(f"⚠️ 标签选择异常: {e}")
-                
-                self.update_progress(90)
-                
-                # 发布或手动
-                if auto_publish:
-                    self.logger.log("🚀 点击发布...")
-                    await page.wait_for_timeout(3000)
+                    # 改用鼠标物理点击，绕过潜在的 JS 事件检测
+                    self.logger.log("🚀 点击发布按钮 (Mouse Mode)...")
                     
-                    # 尝试多种选择器查找发布按钮
-                    btn = None
-                    selectors = [
-                        "button.publishBtn",
-                        "button:has-text('发布')",
-                        ".publish-btn",
-                        "button.css-1gl8z4q",  # 备用类名
-                        "[class*='publish']"
-                    ]
-                    
-                    for sel in selectors:
-                        try:
-                            candidate = page.locator(sel).first
-                            if await candidate.count() > 0 and await candidate.is_visible(timeout=3000):
-                                btn = candidate
-                                self.logger.log(f"✅ 找到发布按钮: {sel}")
-                                break
-                        except:
-                            continue
+                    # 获取按钮位置
+                    box = await btn.bounding_box()
+                    if box:
+                        x = box['x'] + box['width'] / 2
+                        y = box['y'] + box['height'] / 2
+                        
+                        # 模拟人类操作：移动 -> 悬停 -> 点击
+                        await page.mouse.move(x, y, steps=10)
+                        await page.wait_for_timeout(200)
+                        await page.mouse.down()
+                        await page.wait_for_timeout(100)
+                        await page.mouse.up()
+                    else:
+                        # 降级回普通点击
+                        await btn.click()
                     
-                    if btn is None:
-                        self.logger.log("❌ 找不到发布按钮")
-                        await self.logger.save_screenshot(page, "no_publish_btn")
-                        return False
+                    # === 增强的发布确认逻辑 ===
+                    self.logger.log("⏳ 等待发布结果...")
                     try:
-                        # 改用鼠标物理点击，绕过潜在的 JS 事件检测
-                        self.logger.log("🚀 点击发布按钮 (Mouse Mode)...")
+                        # 1. 尝试等待跳转 (发布成功通常会跳回管理页)
+                        # 或者等待出现 "发布成功" 字样
+                        t1 = asyncio.create_task(page.wait_for_url("**/creator/home**", timeout=15000))
+                        t2 = asyncio.create_task(page.wait_for_selector("text=发布成功", timeout=15000))
+                        t3 = asyncio.create_task(page.wait_for_selector("text=发布文章成功", timeout=15000))
                         
-                        # 获取按钮位置
-                        box = await btn.bounding_box()
-                        if box:
-                            x = box['x'] + box['width'] / 2
-                            y = box['y'] + box['height'] / 2
-                            
-                            # 模拟人类操作：移动 -> 悬停 -> 点击
-                            await page.mouse.move(x, y, steps=10)
-                            await page.wait_for_timeout(200)
-                            await page.mouse.down()
-                            await page.wait_for_timeout(100)
-                            await page.mouse.up()
-                        else:
-                            # 降级回普通点击
-                            await btn.click()
+                        done, pending = await asyncio.wait([t1, t2, t3], return_when=asyncio.FIRST_COMPLETED, timeout=20000)
                         
-                        # === 增强的发布确认逻辑 ===
-                        self.logger.log("⏳ 等待发布结果...")
-                        try:
-                            # 1. 尝试等待跳转 (发布成功通常会跳回管理页)
-                            # 或者等待出现 "发布成功" 字样
-                            t1 = asyncio.create_task(page.wait_for_url("**/creator/home**", timeout=15000))
-                            t2 = asyncio.create_task(page.wait_for_selector("text=发布成功", timeout=15000))
-                            t3 = asyncio.create_task(page.wait_for_selector("text=发布文章成功", timeout=15000))
-                            
-                            done, pending = await asyncio.wait([t1, t2, t3], return_when=asyncio.FIRST_COMPLETED, timeout=20000)
-                            
-                            for t in pending:
-                                t.cancel()
-                            
-                            success_signal = False
-                            for t in done:
-                                if not t.cancelled() and not t.exception():
-                                    success_signal = True
-                                    break
-                            
-                            if success_signal:
-                                self.logger.log("✅ 检测到发布成功信号！")
-                            else:
-                                self.logger.log("⚠️ 等待超时或失败，未检测到成功信号")
-                                # 记录失败原因 (如果有异常)
-                                for t in done:
-                                    if t.exception():
-                                        self.logger.log(f"   - 检测任务异常: {t.exception()}")
-
-                        except Exception as e:
-                            self.logger.log(f"⚠️ 检测信号异常: {e}")
+                        for t in pending:
+                            t.cancel()
                         
-                        # 无论是否检测到信号，都截图留证
-                        await page.wait_for_timeout(3000)
-                        await self.logger.save_screenshot(page, "after_publish_attempt")
+                        success_signal = False
+                        for t in done:
+                            if not t.cancelled() and not t.exception():
+                                success_signal = True
+                                break
                         
                         if success_signal:
-                            self.update_progress(100)
-                            return True
+                            self.logger.log("✅ 检测到发布成功信号！")
                         else:
-                            return False
+                            self.logger.log("⚠️ 等待超时或失败，未检测到成功信号")
+                            # 记录失败原因 (如果有异常)
+                            for t in done:
+                                if t.exception():
+                                    self.logger.log(f"   - 检测任务异常: {t.exception()}")
+
                     except Exception as e:
-                        self.logger.log(f"❌ 点击发布按钮失败或超时: {e}")
-                        await self.logger.save_screenshot(page, "publish_click_error")
-                        return False
-                else:
-                    self.logger.log("⏸️ 手动发布模式：请检查内容后手动点击发布")
-                    self.update_progress(95)
-                    # 等待用户操作
-                    await page.wait_for_timeout(600000)  # 10分钟
-                    return True
+                        self.logger.log(f"⚠️ 检测信号异常: {e}")
                     
-            except Exception as e:
-                self.logger.log(f"❌ 发布出错: {e}")
-                await self.logger.save_screenshot(page, "publish_error")
-                return False
-            finally:
-                if auto_publish:
-                    await page.wait_for_timeout(5000)
-                    await context.close()
-                    await browser.close()
+                    # 无论是否检测到信号，都截图留证
+                    await page.wait_for_timeout(3000)
+                    await self.logger.save_screenshot(page, "after_publish_attempt")
+                    
+                    if success_signal:
+                        self.update_progress(100)
+                        return True
+                    else:
+                        return False
+                except Exception as e:
+                    self.logger.log(f"❌ 点击发布按钮失败或超时: {e}")
+                    await self.logger.save_screenshot(page, "publish_click_error")
+                    return False
+            else:
+                self.logger.log("⏸️ 手动发布模式：请检查内容后手动点击发布")
+                self.update_progress(95)
+                # 等待用户操作
+                await page.wait_for_timeout(600000)  # 10分钟
+                return True
+                
+        except Exception as e:
+            self.logger.log(f"❌ 发布出错: {e}")
+            await self.logger.save_screenshot(page, "publish_error")
+            return False
+        finally:
+            if auto_publish:
+                await page.wait_for_timeout(5000)
+            await context.close()
+    
+    async def _paste_text(self, context, page, editor, text):
+        """通过剪贴板一次性粘贴正文 (逐字输入 500 字就要十几秒)，粘贴失败时退回 insert_text"""
+        try:
+            await context.grant_permissions(["clipboard-read", "clipboard-write"], origin=XHS_CREATOR_ORIGIN)
+            await page.evaluate("t => navigator.clipboard.writeText(t)", text)
+            await page.keyboard.press("Meta+V" if sys.platform == "darwin" else "Control+V")
+            await page.wait_for_timeout(300)
+            if (await editor.inner_text()).strip():
+                return
+            self.logger.log("⚠️ 剪贴板粘贴未生效，改为直接输入")
+        except Exception as e:
+            self.logger.log(f"⚠️ 剪贴板粘贴失败，改为直接输入: {e}")
+        await page.keyboard.insert_text(text)
     
     # ================== 5. 归档模块 ==================
     def archive(self):
@@ -657,7 +933,7 @@ class PublishPipeline:
         # 创建归档目录
         date_str = datetime.now().strftime("%Y-%m-%d")
         title = self.ai_data.get('caption_title', '未命名')[:20]
-        safe_title = re.sub(r'[\\/:*?"<>|]', '_', title)
+        safe_title = _UNSAFE_FS_RE.sub('_', title)
         self.archive_dir = os.path.join(ARCHIVES_DIR, f"{date_str}_{safe_title}")
         
         if os.path.exists(self.archive_dir):
@@ -671,8 +947,8 @@ class PublishPipeline:
             f.write(self.scraped_data['full_text'])
         
         # 保存 AI 生成结果
-        with open(os.path.join(self.archive_dir, "AI生成.json"), 'w', encoding='utf-8') as f:
-            json.dump(self.ai_data, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(self.archive_dir, "AI生成.json"), 'wb') as f:
+            f.write(orjson.dumps(self.ai_data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
         
         # 保存配置
         config_snapshot = {
@@ -681,19 +957,33 @@ class PublishPipeline:
             "silent_mode": self.config.is_silent_mode(),
             "auto_publish": self.config.is_auto_publish()
         }
-        with open(os.path.join(self.archive_dir, "配置.json"), 'w', encoding='utf-8') as f:
-            json.dump(config_snapshot, f, ensure_ascii=False, indent=2)
+        with open(os.path.join(self.archive_dir, "配置.json"), 'wb') as f:
+            f.write(orjson.dumps(config_snapshot, option=orjson.OPT_INDENT_2))
         
-        # 复制图片
+        # 复制图片 (copyfile 只拷贝内容，Linux 下走 sendfile 零拷贝)
         images_dir = os.path.join(self.archive_dir, "images")
         os.makedirs(images_dir)
         for img_path in self.image_paths:
-            if os.path.exists(img_path):
-                shutil.copy(img_path, images_dir)
+            try:
+                shutil.copyfile(img_path, os.path.join(images_dir, os.path.basename(img_path)))
+            except FileNotFoundError:
+                pass
         
         self.logger.log(f"✅ 归档完成: {self.archive_dir}")
         return self.archive_dir
     
+    def _archive_quietly(self):
+        """归档失败只记录日志，不影响发布结果"""
+        try:
+            return self.archive()
+        except Exception as e:
+            self.logger.log(f"⚠️ 归档失败: {e}")
+            return None
+    
+    def archive_in_background(self):
+        """在线程池中归档，不阻塞调用方；登记为后台任务，close_sessions()/aclose() 时等待完成"""
+        self._pending.append(asyncio.create_task(asyncio.to_thread(self._archive_quietly)))
+    
     # ================== 完整流程 ==================
     async def run_full_pipeline(self, url, prompt_template, cloud_mode=False):
         """执行完整发布流程
@@ -717,12 +1007,12 @@ class PublishPipeline:
             return False
         
         # 2. AI 生成
-        result = self.generate_content(prompt_template)
+        result = await self.generate_content(prompt_template)
         if not result:
             return False
         
         # 3. 渲染
-        result = self.render_images()
+        result = await asyncio.to_thread(self.render_images)
         if not result:
             return False
         
@@ -736,7 +1026,54 @@ class PublishPipeline:
             auto_publish = self.config.is_auto_publish()
             success = await self.publish(headless=headless, auto_publish=auto_publish)
         
-        # 5. 归档
-        self.archive()
+        # 5. 归档 (后台线程执行，不阻塞返回；aclose() 时等待完成)
+        self.archive_in_background()
         
         return success
+    
+    # ================== 批量流程 ==================
+    def _fork(self):
+        """创建子流水线：共享配置、日志和浏览器，运行时数据各自独立"""
+        job = PublishPipeline(self.config, self.logger)
+        job.browser = self.browser
+        job._http = self._ensure_http()
+        job._http_proxy = self._http_proxy
+        job._owns_resources = False
+        job.image_template = self.image_template
+        return job
+    
+    async def run_batch(self, urls, prompt_template, concurrency=3, cloud_mode=False):
+        """并发处理多个链接
+        
+        每个链接在独立的子流水线中执行完整流程，共享同一个浏览器进程 (各自使用独立的
+        BrowserContext)，同时运行的任务数不超过 concurrency。
+        
+        Returns:
+            list[bool]: 与 urls 一一对应的执行结果
+        """
+        total = len(urls)
+        if not total:
+            return []
+        
+        semaphore = asyncio.Semaphore(concurrency)
+        finished = 0
+        
+        async def _one(index, url):
+            nonlocal finished
+            async with semaphore:
+                job = self._fork()
+                try:
+                    return await job.run_full_pipeline(url, prompt_template, cloud_mode=cloud_mode)
+                except Exception as e:
+                    self.logger.log(f"❌ [{index + 1}/{total}] 处理出错: {url} ({e})")
+                    return False
+                finally:
+                    await job.aclose()
+                    finished += 1
+                    self.update_progress(finished * 100 / total)
+        
+        self.logger.log(f"📚 批量处理 {total} 个链接 (并发 {concurrency})...")
+        self.update_progress(0)
+        results = await asyncio.gather(*(_one(i, url) for i, url in enumerate(urls)))
+        self.logger.log(f"✅ 批量处理完成: 成功 {sum(results)}/{total}")
+        return results
@@ -0,0 +1,66 @@
+# styles.py - 小红书图文模板配色配置
+# 纯数据，不依赖 Pillow；渲染引擎 (xhs_core.py) 从这里导入
+
+STYLES = {
+    'breath': {
+        'BG_COLOR': "#F6F7F9", 'CARD_COLOR': "#F6F7F9", 'TEXT_MAIN': "#333333",
+        'ACCENT_COLOR': "#FF2442", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#666666",
+        'type': 'flat'
+    },
+    'tech_card': {
+        'BG_COLOR': "#F0F5FF", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#1E293B", 
+        'ACCENT_COLOR': "#2563EB", 'SHADOW_COLOR': "#DBEAFE", 'HEADER_COLOR': "#64748B",
+        'type': 'card'
+    },
+    'receipt': {
+        'BG_COLOR': "#0099FF", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#000000",
+        'ACCENT_COLOR': "#FFE66D", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#FFFFFF",
+        'type': 'flat'
+    },
+    'quote': {
+        'BG_COLOR': "#D4F5D4", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#333333",
+        'ACCENT_COLOR': "#FFADD2", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#2E7D32",
+        'type': 'flat'
+    },
+    'cyber': {
+        'BG_COLOR': "#0F172A", 'CARD_COLOR': "#1E293B", 'TEXT_MAIN': "#F1F5F9",
+        'ACCENT_COLOR': "#00E5FF", 'SHADOW_COLOR': "#000000", 'HEADER_COLOR': "#94A3B8",
+        'type': 'card_outline'
+    },
+    'notion': {
+        'BG_COLOR': "#F7F7F5", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#37352F",
+        'ACCENT_COLOR': "#E16259", 'SHADOW_COLOR': "#E0E0E0", 'HEADER_COLOR': "#787774",
+        'type': 'card_minimal'
+    },
+    'magazine': {
+        'BG_COLOR': "#EAEAEA", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#000000",
+        'ACCENT_COLOR': "#FF4500", 'SHADOW_COLOR': "#000000", 'HEADER_COLOR': "#000000",
+        'type': 'magazine_layout'
+    },
+    # ===== 新增：小红书官方风格 =====
+    'quote_blue': {
+        'BG_COLOR': "#FAF8F5", 'CARD_COLOR': "#FAF8F5", 'TEXT_MAIN': "#1A56DB",
+        'ACCENT_COLOR': "#1A56DB", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#1A56DB",
+        'type': 'quote_style'
+    },
+    'sticky': {
+        'BG_COLOR': "#FFD966", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#333333",
+        'ACCENT_COLOR': "#FFD966", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#666666",
+        'type': 'sticky_note'
+    },
+    'card_blue': {
+        'BG_COLOR': "#4285F4", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#000000",
+        'ACCENT_COLOR': "#4285F4", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#4285F4",
+        'type': 'card_style'
+    },
+    'postit': {
+        'BG_COLOR': "#E8F5B4", 'CARD_COLOR': "#E8F5B4", 'TEXT_MAIN': "#333333",
+        'ACCENT_COLOR': "#C5D99A", 'SHADOW_COLOR': "#CCCCCC", 'HEADER_COLOR': "#999999",
+        'type': 'postit_style'
+    },
+    'ticket': {
+        'BG_COLOR': "#2ECC71", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#000000",
+        'ACCENT_COLOR': "#2ECC71", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#2ECC71",
+        'type': 'ticket_style'
+    }
+}
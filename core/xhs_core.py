@@ -1,75 +1,20 @@
 # xhs_core.py - 小红书图片生成核心引擎 (多风格版)
 # 此文件为测试工具专用副本，不影响主脚本
 
+import io
 import os
 import re
+import asyncio
+import functools
 from PIL import Image, ImageDraw, ImageFont, ImageColor
 
 # ================= 1. 模板与配色配置 =================
 
-STYLES = {
-    'breath': {
-        'BG_COLOR': "#F6F7F9", 'CARD_COLOR': "#F6F7F9", 'TEXT_MAIN': "#333333",
-        'ACCENT_COLOR': "#FF2442", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#666666",
-        'type': 'flat'
-    },
-    'tech_card': {
-        'BG_COLOR': "#F0F5FF", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#1E293B", 
-        'ACCENT_COLOR': "#2563EB", 'SHADOW_COLOR': "#DBEAFE", 'HEADER_COLOR': "#64748B",
-        'type': 'card'
-    },
-    'receipt': {
-        'BG_COLOR': "#0099FF", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#000000",
-        'ACCENT_COLOR': "#FFE66D", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#FFFFFF",
-        'type': 'flat'
-    },
-    'quote': {
-        'BG_COLOR': "#D4F5D4", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#333333",
-        'ACCENT_COLOR': "#FFADD2", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#2E7D32",
-        'type': 'flat'
-    },
-    'cyber': {
-        'BG_COLOR': "#0F172A", 'CARD_COLOR': "#1E293B", 'TEXT_MAIN': "#F1F5F9",
-        'ACCENT_COLOR': "#00E5FF", 'SHADOW_COLOR': "#000000", 'HEADER_COLOR': "#94A3B8",
-        'type': 'card_outline'
-    },
-    'notion': {
-        'BG_COLOR': "#F7F7F5", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#37352F",
-        'ACCENT_COLOR': "#E16259", 'SHADOW_COLOR': "#E0E0E0", 'HEADER_COLOR': "#787774",
-        'type': 'card_minimal'
-    },
-    'magazine': {
-        'BG_COLOR': "#EAEAEA", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#000000",
-        'ACCENT_COLOR': "#FF4500", 'SHADOW_COLOR': "#000000", 'HEADER_COLOR': "#000000",
-        'type': 'magazine_layout'
-    },
-    # ===== 新增：小红书官方风格 =====
-    'quote_blue': {
-        'BG_COLOR': "#FAF8F5", 'CARD_COLOR': "#FAF8F5", 'TEXT_MAIN': "#1A56DB",
-        'ACCENT_COLOR': "#1A56DB", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#1A56DB",
-        'type': 'quote_style'
-    },
-    'sticky': {
-        'BG_COLOR': "#FFD966", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#333333",
-        'ACCENT_COLOR': "#FFD966", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#666666",
-        'type': 'sticky_note'
-    },
-    'card_blue': {
-        'BG_COLOR': "#4285F4", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#000000",
-        'ACCENT_COLOR': "#4285F4", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#4285F4",
-        'type': 'card_style'
-    },
-    'postit': {
-        'BG_COLOR': "#E8F5B4", 'CARD_COLOR': "#E8F5B4", 'TEXT_MAIN': "#333333",
-        'ACCENT_COLOR': "#C5D99A", 'SHADOW_COLOR': "#CCCCCC", 'HEADER_COLOR': "#999999",
-        'type': 'postit_style'
-    },
-    'ticket': {
-        'BG_COLOR': "#2ECC71", 'CARD_COLOR': "#FFFFFF", 'TEXT_MAIN': "#000000",
-        'ACCENT_COLOR': "#2ECC71", 'SHADOW_COLOR': None, 'HEADER_COLOR': "#2ECC71",
-        'type': 'ticket_style'
-    }
-}
+# 配色表是纯数据，单独放在 styles.py (不依赖 Pillow，只需配色时可单独导入)
+try:
+    from .styles import STYLES
+except ImportError:
+    from styles import STYLES
 
 # ================= 2. 全局参数 =================
 
@@ -81,13 +26,26 @@ LINE_SPACING = 22
 PARA_SPACING = 44
 CARD_MARGIN_OUTER = 50
 CARD_PADDING_INNER = 50
+# PNG 压缩等级 (0-9)：小红书上传后会重新编码，用最快的压缩即可，仍为无损
+PNG_COMPRESS_LEVEL = 1
+
+# 正文页卡片区域
+BODY_CARD_X = CARD_MARGIN_OUTER
+BODY_CARD_Y = 150
+BODY_CARD_W = WIDTH - (CARD_MARGIN_OUTER * 2)
+BODY_CARD_H = HEIGHT - 200
 
 # ================= 3. 动态资源加载（跨平台兼容） =================
 
 def find_font(font_names, fallback=None):
     """
     在多个位置查找字体文件 (Windows/Linux/Android)
+    结果按 (字体名列表, fallback) 缓存，同一进程内相同查询只扫描一次文件系统
     """
+    return _find_font(tuple(font_names), fallback)
+
+@functools.lru_cache(maxsize=None)
+def _find_font(font_names, fallback):
     search_paths = [
         os.path.join(os.path.dirname(__file__), "../assets/fonts"),  # 本地资源
         os.path.join(os.path.dirname(__file__), "assets/fonts"),
@@ -126,43 +84,103 @@ FONT_PATH_EN = find_font([
 
 # ================= 4. 工具函数库 =================
 
+@functools.lru_cache(maxsize=None)
+def _font_bytes(path):
+    """字体文件整体读入内存，每个文件只读一次
+    (BytesIO 整读返回同一个 bytes 对象，各字号的字体实例共享这份数据，不会重复占用内存)"""
+    with open(path, 'rb') as f:
+        return f.read()
+
+@functools.lru_cache(maxsize=None)
 def get_font(path, size):
+    """加载字体 (按 路径+字号 缓存，每个进程只解析一次)"""
     if not path:
         return ImageFont.load_default()
     try: 
-        return ImageFont.truetype(path, size)
+        return ImageFont.truetype(io.BytesIO(_font_bytes(path)), size)
     except: 
         return ImageFont.load_default()
 
+@functools.lru_cache(maxsize=None)
+def _length_func(font):
+    """按字体能力一次性确定宽度测量函数，测量时不再走 try/except
+    FreeType 字体直接用 getlength；位图兜底字体 (不支持中文) 按 字数×字号 估算"""
+    if isinstance(font, ImageFont.FreeTypeFont):
+        return font.getlength
+    size = getattr(font, 'size', BODY_FONT_SIZE)
+    return lambda s: len(s) * size
+
+# 文本宽度缓存: (id(font), 文本) -> 宽度
+# 字体对象由 get_font 长期持有，id 在进程内稳定
+_WIDTH_CACHE = {}
+_WIDTH_CACHE_MAX = 50000
+
+def _measure(font, s):
+    """测量文本宽度 (带缓存，避免重复调用 getlength 做字形排版)"""
+    k = (id(font), s)
+    w = _WIDTH_CACHE.get(k)
+    if w is None:
+        w = _length_func(font)(s)
+        if len(_WIDTH_CACHE) >= _WIDTH_CACHE_MAX:
+            _WIDTH_CACHE.clear()
+        _WIDTH_CACHE[k] = w
+    return w
+
 def hex_to_rgba(hex_color, opacity):
     rgb = ImageColor.getrgb(hex_color)
     return rgb + (int(opacity * 255),)
 
+# BMP 以外的字符 (emoji 等)
+_CLEAN_RE = re.compile(r'[^\u0000-\uFFFF]')
+
 def clean_text(text):
-    return re.sub(r'[^\u0000-\uFFFF]', '', text)
+    # 绝大多数文本不含 BMP 以外的字符，无需处理
+    if not text or max(text) <= '\uffff':
+        return text
+    return _CLEAN_RE.sub('', text)
+
+# 英文单词字符: 连续出现时合并为一个 token
+_WORD_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-_.")
 
 def tokenize(text):
-    pattern = r'([a-zA-Z0-9\-\_\.]+|[^\x00-\xff]|\S|\s)'
-    tokens = re.findall(pattern, text)
-    return [t for t in tokens if t]
+    """分词: 英文/数字连续串为一个 token，其余字符 (中文、标点、空白) 各自成 token"""
+    tokens = []
+    i, n = 0, len(text)
+    while i < n:
+        c = text[i]
+        if c in _WORD_CHARS:
+            j = i + 1
+            while j < n and text[j] in _WORD_CHARS:
+                j += 1
+            tokens.append(text[i:j])
+            i = j
+        else:
+            tokens.append(c)
+            i += 1
+    return tokens
 
 def layout_paragraph(text, font, max_width):
     tokens = tokenize(text)
     lines = []
     current_line = ""
-    current_w = 0
+    length = _length_func(font)
     avoid_chars = ".,;!?)]}。，；！？、）】"
     
+    # 行宽先用缓存的 token 宽度累加估算 (同一字符/单词只排版一次)；
+    # 只有估算值落在行尾一个字宽以内时，才对整行做一次精确测量 (含字距调整)
+    safe_width = max_width - getattr(font, 'size', BODY_FONT_SIZE)
+    current_w = 0
+    
     for token in tokens:
-        try: w = font.getlength(token)
-        except: w = len(token) * font.size
-        
-        if current_w + w <= max_width:
-            current_line += token
+        w = _measure(font, token)
+        candidate = current_line + token
+        if current_w + w <= safe_width or length(candidate) <= max_width:
+            current_line = candidate
             current_w += w
         else:
             if token in avoid_chars and w < 60: 
                 current_line += token
+                current_w += w
             elif token.isspace():
                 pass 
             else:
@@ -190,43 +208,117 @@ def get_adaptive_font_for_title(lines, base_font_size, min_font_size, max_width,
     - 如果有行超出 max_width，逐步缩小字体
     - 最小不低于 min_font_size
     返回：(font, font_size)
+    结果按 (行, 字号范围, 宽度, 字体) 缓存，同一标题换模板/重跑时无需重新试探
     """
-    font_size = base_font_size
-    while font_size >= min_font_size:
+    return _adaptive_font_cached(tuple(lines), base_font_size, min_font_size, max_width, font_path)
+
+@functools.lru_cache(maxsize=256)
+def _adaptive_font_cached(lines, base_font_size, min_font_size, max_width, font_path):
+    def fits(font_size):
         font = get_font(font_path, font_size)
-        all_fit = True
-        for line in lines:
-            try:
-                w = font.getlength(line)
-            except:
-                w = len(line) * font_size
-            if w > max_width:
-                all_fit = False
-                break
-        if all_fit:
-            return font, font_size
-        font_size -= 5
+        return all(_measure(font, line) <= max_width for line in lines)
+    
+    # 候选字号从大到小 (步长 5)；字号越大越容易超宽，二分查找第一个放得下的
+    sizes = list(range(base_font_size, min_font_size - 1, -5))
+    lo, hi = 0, len(sizes)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if fits(sizes[mid]):
+            hi = mid
+        else:
+            lo = mid + 1
+    if lo < len(sizes):
+        return get_font(font_path, sizes[lo]), sizes[lo]
     # 返回最小字体
     return get_font(font_path, min_font_size), min_font_size
 
 def draw_text_native(draw, xy, text, font, fill):
     draw.text(xy, text.strip(), font=font, fill=fill)
 
+def draw_text_lines(draw, xy, lines, font, fill, line_height):
+    """按固定行高逐行绘制左对齐文本块
+    (不用 multiline_text：它会额外测量每行宽度做对齐，且行距按字形 bbox 计算，与 line_height 不一致)"""
+    x, y = xy
+    text = draw.text
+    for line in lines:
+        text((x, y), line, font=font, fill=fill)
+        y += line_height
+
 def draw_text_centered(draw, xy, text, font, fill):
     x, y = xy
-    try: w = font.getlength(text)
-    except: w = len(text) * font.size
+    w = _measure(font, text)
     draw.text((x - w/2, y), text, font=font, fill=fill)
 
+@functools.lru_cache(maxsize=None)
+def _tooth_strip_mask(margin, tooth_size):
+    """票据底部圆形锯齿的蒙版条 (宽 WIDTH，高 tooth_size)，只绘制一次"""
+    mask = Image.new('L', (WIDTH, tooth_size + 1), 0)
+    m_draw = ImageDraw.Draw(mask)
+    for i in range(int((WIDTH - 2 * margin) / tooth_size) + 1):
+        cx_t = margin + i * tooth_size + tooth_size/2
+        m_draw.ellipse((cx_t - tooth_size/2, 0, cx_t + tooth_size/2, tooth_size), fill=255)
+    return mask
+
+# 正文页卡片背景: 每个模板一个绘制函数，rect = (x, y, w, h)
+def _draw_body_card_tech_card(draw, cfg, rect):
+    x, y, w, h = rect
+    draw.rounded_rectangle([(x+15, y+15), (x+w+15, y+h+15)], radius=30, fill=cfg['SHADOW_COLOR'])
+    draw.rounded_rectangle([(x, y), (x+w, y+h)], radius=30, fill=cfg['CARD_COLOR'])
+
+def _draw_body_card_cyber(draw, cfg, rect):
+    x, y, w, h = rect
+    draw.rounded_rectangle([(x, y), (x+w, y+h)], radius=20, outline=cfg['ACCENT_COLOR'], width=2)
+    draw.rounded_rectangle([(x, y), (x+w, y+h)], radius=20, fill=cfg['CARD_COLOR'])
+
+def _draw_body_card_magazine(draw, cfg, rect):
+    x, y, w, h = rect
+    draw.rectangle([(x, y), (x+w, y+h)], outline="#000", width=4, fill="#FFFFFF")
+
+def _draw_body_card_bordered(draw, cfg, rect):
+    # 呼吸感和蓝色引言：白色卡片 + 浅色边框
+    x, y, w, h = rect
+    draw.rounded_rectangle([(x, y), (x+w, y+h)], radius=30, fill="#FFFFFF", outline="#E0E0E0", width=2)
+
+def _draw_body_card_default(draw, cfg, rect):
+    x, y, w, h = rect
+    draw.rounded_rectangle([(x, y), (x+w, y+h)], radius=30, fill=cfg['CARD_COLOR'])
+
+_BODY_CARD_DRAWERS = {
+    'tech_card': _draw_body_card_tech_card,
+    'cyber': _draw_body_card_cyber,
+    'magazine': _draw_body_card_magazine,
+    'breath': _draw_body_card_bordered,
+    'quote_blue': _draw_body_card_bordered,
+}
+
+# 预热正文/页眉常用字号
+for _path, _size in ((FONT_PATH_REGULAR, BODY_FONT_SIZE), (FONT_PATH_BOLD, TITLE_FONT_SIZE), (FONT_PATH_BOLD, 40), (FONT_PATH_REGULAR, 40)):
+    get_font(_path, _size)
+
 # ================= 4. 渲染逻辑 =================
 
 class XHSGenerator:
+    # 封面绘制方法: 模板名 -> 方法名 (未列出的模板走通用卡片封面)
+    _COVER_DRAWERS = {
+        'magazine': '_draw_cover_magazine',
+        'breath': '_draw_cover_breath',
+        'quote_blue': '_draw_cover_quote_blue',
+        'sticky': '_draw_cover_sticky',
+        'card_blue': '_draw_cover_card_blue',
+        'postit': '_draw_cover_postit',
+        'ticket': '_draw_cover_ticket',
+    }
+    # 正文页底图缓存 (卡片+页眉)，按 (模板, 页眉文字) 共享，同一进程内只绘制一次
+    _page_templates = {}
+
     def __init__(self, template_name, header_text, footer_text, output_dir="xhs_output"):
         self.template_name = template_name
         self.style = STYLES.get(template_name, STYLES['tech_card'])
         self.header_text = header_text
         self.footer_text = footer_text
         self.output_dir = output_dir
+        # 按模板一次性解析封面绘制方法，避免每次渲染走 if 链
+        self._draw_cover = getattr(self, self._COVER_DRAWERS.get(template_name, '_draw_cover_standard'))
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
@@ -245,174 +337,164 @@ class XHSGenerator:
         line_height = font_size + 40
         current_y = 400
         
-        for line in lines:
-            draw.text((margin_left, current_y), line, font=font, fill=cfg['TEXT_MAIN'])
-            current_y += line_height
+        draw_text_lines(draw, (margin_left, current_y), lines, font, cfg['TEXT_MAIN'], line_height)
         
         draw.rectangle([(margin_left, HEIGHT - 300), (WIDTH - 100, HEIGHT - 290)], fill="#000000")
         f_font = get_font(FONT_PATH_BOLD, 50)
-        try: f_w = f_font.getlength(self.footer_text)
-        except: f_w = len(self.footer_text) * 50
+        f_w = _measure(f_font, self.footer_text)
         draw.text((WIDTH - 100 - f_w, HEIGHT - 250), self.footer_text, font=f_font, fill="#000000")
 
-    def _draw_cover_standard(self, img, draw, title):
+    def _draw_cover_breath(self, img, draw, title):
+        """Breath 呼吸感风格"""
         cfg = self.style
-        img.paste(Image.new('RGB', img.size, cfg['BG_COLOR']))
-        draw = ImageDraw.Draw(img)
-
-        # ===== Breath 呼吸感风格 =====
-        if self.template_name == 'breath':
-            # 顶部深色色块
-            draw.rectangle([(0, 0), (WIDTH, 200)], fill=cfg['TEXT_MAIN'])
-            draw.text((60, 60), "AI DAILY NEWS", font=get_font(FONT_PATH_BOLD, 40), fill="#FFFFFF")
-            
-            # 标题绘制：信任用户分行 + 自适应字体
-            max_title_width = WIDTH - 200
-            lines = layout_cover_title(title, None, max_title_width, max_lines=4)
-            font, font_size = get_adaptive_font_for_title(lines, 120, 75, max_title_width, FONT_PATH_BOLD)
-            
-            line_height = font_size + 40
-            start_y = 500
-            
-            for i, line in enumerate(lines):
-                line_y = start_y + i * line_height
-                # 阴影效果
-                draw.text((105, line_y+5), line, font=font, fill="#dddddd")
-                # 正文
-                draw.text((100, line_y), line, font=font, fill=cfg['TEXT_MAIN'])
-            
-            # 底部红色装饰线
-            final_y = start_y + len(lines) * line_height + 50
-            draw.line([100, final_y, 300, final_y], fill=cfg['ACCENT_COLOR'], width=10)
-            return  # breath 封面处理完毕
-
-        # ===== quote_blue 蓝色引言风格 =====
-        if self.template_name == 'quote_blue':
-            # 圆角背景卡片
-            draw.rounded_rectangle([(40, 40), (WIDTH-40, HEIGHT-40)], radius=60, fill=cfg['BG_COLOR'])
-            # 左上角蓝色引号 (使用中文引号)
-            quote_font = get_font(FONT_PATH_BOLD, 120)
-            draw.text((80, 80), '"', font=quote_font, fill=cfg['ACCENT_COLOR'])
-            # 右下角蓝色引号
-            draw.text((80, HEIGHT-220), '"', font=quote_font, fill=cfg['ACCENT_COLOR'])
-            # 标题绘制：信任用户分行 + 自适应字体
-            max_title_width = WIDTH - 240
-            lines = layout_cover_title(title, None, max_title_width, max_lines=4)
-            font, font_size = get_adaptive_font_for_title(lines, 110, 65, max_title_width, FONT_PATH_BOLD)
-            line_height = font_size + 40
-            start_y = 400
-            for i, line in enumerate(lines):
-                draw.text((120, start_y + i * line_height), line, font=font, fill=cfg['TEXT_MAIN'])
-            return
-
-        # ===== sticky 黄色便签风格 =====
-        if self.template_name == 'sticky':
-            margin = 60
-            # 黄色外框
-            draw.rounded_rectangle([(margin, margin), (WIDTH-margin, HEIGHT-margin)], radius=40, fill=cfg['ACCENT_COLOR'])
-            # 白色内卡
-            inner_margin = margin + 30
-            inner_top = margin + 100
-            draw.rounded_rectangle([(inner_margin, inner_top), (WIDTH-inner_margin, HEIGHT-inner_margin-30)], radius=30, fill=cfg['CARD_COLOR'])
-            # 顶部装饰
-            draw.text((inner_margin + 20, margin + 25), "Sticky Notes", font=get_font(FONT_PATH_BOLD, 36), fill="#666666")
-            draw.ellipse((WIDTH//2 - 15, margin + 25, WIDTH//2 + 15, margin + 55), fill="#FFB800")
-            draw.text((WIDTH - inner_margin - 160, margin + 25), "AI Daily", font=get_font(FONT_PATH_BOLD, 36), fill="#666666")
-            # 横线装饰
-            line_start_y = inner_top + 60
-            for i in range(12):
-                y = line_start_y + i * 85
-                if y < HEIGHT - inner_margin - 100:
-                    draw.line([(inner_margin + 30, y), (WIDTH - inner_margin - 30, y)], fill="#E0E0E0", width=2)
-            # 标题绘制：信任用户分行 + 自适应字体
-            max_title_width = WIDTH - 2 * inner_margin - 100
-            lines = layout_cover_title(title, None, max_title_width, max_lines=4)
-            font, font_size = get_adaptive_font_for_title(lines, 100, 65, max_title_width, FONT_PATH_BOLD)
-            line_height = font_size + 30
-            start_y = inner_top + 200
-            for i, line in enumerate(lines):
-                draw.text((inner_margin + 50, start_y + i * line_height), line, font=font, fill=cfg['TEXT_MAIN'])
-            return
-
-        # ===== card_blue 蓝色卡片风格 =====
-        if self.template_name == 'card_blue':
-            margin = 50
-            # 蓝色背景
-            draw.rounded_rectangle([(0, 0), (WIDTH, HEIGHT)], radius=0, fill=cfg['BG_COLOR'])
-            # 白色卡片
-            card_margin = 80
-            card_top = 100
-            card_bottom = HEIGHT - 180
-            draw.rounded_rectangle([(card_margin, card_top), (WIDTH-card_margin, card_bottom)], radius=40, fill=cfg['CARD_COLOR'])
-            # 底部标签
-            draw.text((card_margin + 40, card_bottom + 40), "Monday", font=get_font(FONT_PATH_BOLD, 36), fill="#FFFFFF")
-            draw.text((WIDTH - card_margin - 180, card_bottom + 40), "Text Note", font=get_font(FONT_PATH_BOLD, 36), fill="#FFFFFF")
-            # 标题绘制：信任用户分行 + 自适应字体
-            max_title_width = WIDTH - 2 * card_margin - 160
-            lines = layout_cover_title(title, None, max_title_width, max_lines=4)
-            font, font_size = get_adaptive_font_for_title(lines, 110, 65, max_title_width, FONT_PATH_BOLD)
-            line_height = font_size + 40
-            start_y = card_top + 250
-            for i, line in enumerate(lines):
-                draw.text((card_margin + 80, start_y + i * line_height), line, font=font, fill=cfg['TEXT_MAIN'])
-            return
-
-        # ===== postit 便利贴风格 (浅粉色系) =====
-        if self.template_name == 'postit':
-            margin = 60
+        # 顶部深色色块
+        draw.rectangle([(0, 0), (WIDTH, 200)], fill=cfg['TEXT_MAIN'])
+        draw.text((60, 60), "AI DAILY NEWS", font=get_font(FONT_PATH_BOLD, 40), fill="#FFFFFF")
+        
+        # 标题绘制：信任用户分行 + 自适应字体
+        max_title_width = WIDTH - 200
+        lines = layout_cover_title(title, None, max_title_width, max_lines=4)
+        font, font_size = get_adaptive_font_for_title(lines, 120, 75, max_title_width, FONT_PATH_BOLD)
+        
+        line_height = font_size + 40
+        start_y = 500
+        
+        for i, line in enumerate(lines):
+            line_y = start_y + i * line_height
             # 阴影效果
-            draw.polygon([(margin+15, margin+20), (WIDTH-margin+8, margin+15), 
-                         (WIDTH-margin+12, HEIGHT-margin+8), (margin+8, HEIGHT-margin+12)], fill="#E0E0E0")
-            # 便利贴主体 (浅粉色)
-            draw.rectangle([(margin, margin), (WIDTH-margin, HEIGHT-margin)], fill="#FFE4EC")
-            # 右上角胶带效果
-            tape_w, tape_h = 100, 50
-            tape_x, tape_y = WIDTH - margin - 60, margin - 15
-            draw.polygon([(tape_x, tape_y), (tape_x+tape_w, tape_y-10), 
-                         (tape_x+tape_w+5, tape_y+tape_h), (tape_x-5, tape_y+tape_h+10)], fill="#F5DEB3")
-            # 标题绘制：信任用户分行 + 自适应字体
-            max_title_width = WIDTH - 2 * margin - 160
-            lines = layout_cover_title(title, None, max_title_width, max_lines=4)
-            font, font_size = get_adaptive_font_for_title(lines, 100, 65, max_title_width, FONT_PATH_BOLD)
-            line_height = font_size + 40
-            start_y = 400
-            for i, line in enumerate(lines):
-                draw.text((margin + 80, start_y + i * line_height), line, font=font, fill="#333333")
-            # 右下角签名
-            draw.text((WIDTH - margin - 200, HEIGHT - margin - 80), "...Note!", font=get_font(FONT_PATH_REGULAR, 40), fill="#CC6699")
-            return
-
-        # ===== ticket 绿色票据风格 =====
-        if self.template_name == 'ticket':
-            margin = 50
-            # 绿色背景
-            draw.rounded_rectangle([(0, 0), (WIDTH, HEIGHT)], radius=50, fill=cfg['BG_COLOR'])
-            # 白色票据卡片
-            card_margin = 80
-            card_top = 100
-            card_bottom = HEIGHT - 100
-            draw.rounded_rectangle([(card_margin, card_top), (WIDTH-card_margin, card_bottom)], radius=30, fill=cfg['CARD_COLOR'])
-            # 顶部绿色装饰条
-            draw.rectangle([(card_margin, card_top), (WIDTH-card_margin, card_top + 50)], fill=cfg['ACCENT_COLOR'])
-            # 底部锯齿效果
-            tooth_size = 25
-            tooth_y = card_bottom
-            for i in range(int((WIDTH - 2 * card_margin) / tooth_size) + 1):
-                cx_t = card_margin + i * tooth_size + tooth_size/2
-                draw.polygon([(cx_t - tooth_size/2, tooth_y), (cx_t, tooth_y + tooth_size), 
-                             (cx_t + tooth_size/2, tooth_y)], fill=cfg['BG_COLOR'])
-            # 底部文字
-            draw.text((card_margin + 30, card_bottom - 80), "MONDAY", font=get_font(FONT_PATH_EN, 32), fill="#AAAAAA")
-            draw.text((WIDTH - card_margin - 100, card_bottom - 80), "###", font=get_font(FONT_PATH_EN, 32), fill="#AAAAAA")
-            # 标题绘制：信任用户分行 + 自适应字体
-            max_title_width = WIDTH - 2 * card_margin - 160
-            lines = layout_cover_title(title, None, max_title_width, max_lines=4)
-            font, font_size = get_adaptive_font_for_title(lines, 110, 65, max_title_width, FONT_PATH_BOLD)
-            line_height = font_size + 40
-            start_y = card_top + 250
-            for i, line in enumerate(lines):
-                draw.text((card_margin + 80, start_y + i * line_height), line, font=font, fill=cfg['TEXT_MAIN'])
-            return
+            draw.text((105, line_y+5), line, font=font, fill="#dddddd")
+            # 正文
+            draw.text((100, line_y), line, font=font, fill=cfg['TEXT_MAIN'])
+        
+        # 底部红色装饰线
+        final_y = start_y + len(lines) * line_height + 50
+        draw.line([100, final_y, 300, final_y], fill=cfg['ACCENT_COLOR'], width=10)
+
+    def _draw_cover_quote_blue(self, img, draw, title):
+        """quote_blue 蓝色引言风格"""
+        cfg = self.style
+        # 圆角背景卡片
+        draw.rounded_rectangle([(40, 40), (WIDTH-40, HEIGHT-40)], radius=60, fill=cfg['BG_COLOR'])
+        # 左上角蓝色引号 (使用中文引号)
+        quote_font = get_font(FONT_PATH_BOLD, 120)
+        draw.text((80, 80), '"', font=quote_font, fill=cfg['ACCENT_COLOR'])
+        # 右下角蓝色引号
+        draw.text((80, HEIGHT-220), '"', font=quote_font, fill=cfg['ACCENT_COLOR'])
+        # 标题绘制：信任用户分行 + 自适应字体
+        max_title_width = WIDTH - 240
+        lines = layout_cover_title(title, None, max_title_width, max_lines=4)
+        font, font_size = get_adaptive_font_for_title(lines, 110, 65, max_title_width, FONT_PATH_BOLD)
+        line_height = font_size + 40
+        start_y = 400
+        draw_text_lines(draw, (120, start_y), lines, font, cfg['TEXT_MAIN'], line_height)
+
+    def _draw_cover_sticky(self, img, draw, title):
+        """sticky 黄色便签风格"""
+        cfg = self.style
+        margin = 60
+        # 黄色外框
+        draw.rounded_rectangle([(margin, margin), (WIDTH-margin, HEIGHT-margin)], radius=40, fill=cfg['ACCENT_COLOR'])
+        # 白色内卡
+        inner_margin = margin + 30
+        inner_top = margin + 100
+        draw.rounded_rectangle([(inner_margin, inner_top), (WIDTH-inner_margin, HEIGHT-inner_margin-30)], radius=30, fill=cfg['CARD_COLOR'])
+        # 顶部装饰
+        draw.text((inner_margin + 20, margin + 25), "Sticky Notes", font=get_font(FONT_PATH_BOLD, 36), fill="#666666")
+        draw.ellipse((WIDTH//2 - 15, margin + 25, WIDTH//2 + 15, margin + 55), fill="#FFB800")
+        draw.text((WIDTH - inner_margin - 160, margin + 25), "AI Daily", font=get_font(FONT_PATH_BOLD, 36), fill="#666666")
+        # 横线装饰
+        line_start_y = inner_top + 60
+        for i in range(12):
+            y = line_start_y + i * 85
+            if y < HEIGHT - inner_margin - 100:
+                draw.line([(inner_margin + 30, y), (WIDTH - inner_margin - 30, y)], fill="#E0E0E0", width=2)
+        # 标题绘制：信任用户分行 + 自适应字体
+        max_title_width = WIDTH - 2 * inner_margin - 100
+        lines = layout_cover_title(title, None, max_title_width, max_lines=4)
+        font, font_size = get_adaptive_font_for_title(lines, 100, 65, max_title_width, FONT_PATH_BOLD)
+        line_height = font_size + 30
+        start_y = inner_top + 200
+        draw_text_lines(draw, (inner_margin + 50, start_y), lines, font, cfg['TEXT_MAIN'], line_height)
+
+    def _draw_cover_card_blue(self, img, draw, title):
+        """card_blue 蓝色卡片风格"""
+        cfg = self.style
+        # 蓝色背景
+        draw.rounded_rectangle([(0, 0), (WIDTH, HEIGHT)], radius=0, fill=cfg['BG_COLOR'])
+        # 白色卡片
+        card_margin = 80
+        card_top = 100
+        card_bottom = HEIGHT - 180
+        draw.rounded_rectangle([(card_margin, card_top), (WIDTH-card_margin, card_bottom)], radius=40, fill=cfg['CARD_COLOR'])
+        # 底部标签
+        draw.text((card_margin + 40, card_bottom + 40), "Monday", font=get_font(FONT_PATH_BOLD, 36), fill="#FFFFFF")
+        draw.text((WIDTH - card_margin - 180, card_bottom + 40), "Text Note", font=get_font(FONT_PATH_BOLD, 36), fill="#FFFFFF")
+        # 标题绘制：信任用户分行 + 自适应字体
+        max_title_width = WIDTH - 2 * card_margin - 160
+        lines = layout_cover_title(title, None, max_title_width, max_lines=4)
+        font, font_size = get_adaptive_font_for_title(lines, 110, 65, max_title_width, FONT_PATH_BOLD)
+        line_height = font_size + 40
+        start_y = card_top + 250
+        draw_text_lines(draw, (card_margin + 80, start_y), lines, font, cfg['TEXT_MAIN'], line_height)
+
+    def _draw_cover_postit(self, img, draw, title):
+        """postit 便利贴风格 (浅粉色系)"""
+        margin = 60
+        # 阴影效果
+        draw.polygon([(margin+15, margin+20), (WIDTH-margin+8, margin+15), 
+                     (WIDTH-margin+12, HEIGHT-margin+8), (margin+8, HEIGHT-margin+12)], fill="#E0E0E0")
+        # 便利贴主体 (浅粉色)
+        draw.rectangle([(margin, margin), (WIDTH-margin, HEIGHT-margin)], fill="#FFE4EC")
+        # 右上角胶带效果
+        tape_w, tape_h = 100, 50
+        tape_x, tape_y = WIDTH - margin - 60, margin - 15
+        draw.polygon([(tape_x, tape_y), (tape_x+tape_w, tape_y-10), 
+                     (tape_x+tape_w+5, tape_y+tape_h), (tape_x-5, tape_y+tape_h+10)], fill="#F5DEB3")
+        # 标题绘制：信任用户分行 + 自适应字体
+        max_title_width = WIDTH - 2 * margin - 160
+        lines = layout_cover_title(title, None, max_title_width, max_lines=4)
+        font, font_size = get_adaptive_font_for_title(lines, 100, 65, max_title_width, FONT_PATH_BOLD)
+        line_height = font_size + 40
+        start_y = 400
+        draw_text_lines(draw, (margin + 80, start_y), lines, font, "#333333", line_height)
+        # 右下角签名
+        draw.text((WIDTH - margin - 200, HEIGHT - margin - 80), "...Note!", font=get_font(FONT_PATH_REGULAR, 40), fill="#CC6699")
+
+    def _draw_cover_ticket(self, img, draw, title):
+        """ticket 绿色票据风格"""
+        cfg = self.style
+        # 绿色背景
+        draw.rounded_rectangle([(0, 0), (WIDTH, HEIGHT)], radius=50, fill=cfg['BG_COLOR'])
+        # 白色票据卡片
+        card_margin = 80
+        card_top = 100
+        card_bottom = HEIGHT - 100
+        draw.rounded_rectangle([(card_margin, card_top), (WIDTH-card_margin, card_bottom)], radius=30, fill=cfg['CARD_COLOR'])
+        # 顶部绿色装饰条
+        draw.rectangle([(card_margin, card_top), (WIDTH-card_margin, card_top + 50)], fill=cfg['ACCENT_COLOR'])
+        # 底部锯齿效果
+        tooth_size = 25
+        tooth_y = card_bottom
+        # 所有锯齿拼成一条折线，一次 polygon 画完
+        teeth = []
+        for i in range(int((WIDTH - 2 * card_margin) / tooth_size) + 1):
+            cx_t = card_margin + i * tooth_size + tooth_size/2
+            teeth += [(cx_t - tooth_size/2, tooth_y), (cx_t, tooth_y + tooth_size), (cx_t + tooth_size/2, tooth_y)]
+        draw.polygon(teeth, fill=cfg['BG_COLOR'])
+        # 底部文字
+        draw.text((card_margin + 30, card_bottom - 80), "MONDAY", font=get_font(FONT_PATH_EN, 32), fill="#AAAAAA")
+        draw.text((WIDTH - card_margin - 100, card_bottom - 80), "###", font=get_font(FONT_PATH_EN, 32), fill="#AAAAAA")
+        # 标题绘制：信任用户分行 + 自适应字体
+        max_title_width = WIDTH - 2 * card_margin - 160
+        lines = layout_cover_title(title, None, max_title_width, max_lines=4)
+        font, font_size = get_adaptive_font_for_title(lines, 110, 65, max_title_width, FONT_PATH_BOLD)
+        line_height = font_size + 40
+        start_y = card_top + 250
+        draw_text_lines(draw, (card_margin + 80, start_y), lines, font, cfg['TEXT_MAIN'], line_height)
+
+    def _draw_cover_standard(self, img, draw, title):
+        """通用卡片封面 (tech_card / cyber / notion / receipt / quote 等)"""
+        cfg = self.style
 
         # ===== tech_card 顶部装饰 =====
         if self.template_name == 'tech_card':
@@ -444,9 +526,7 @@ class XHSGenerator:
             draw.rectangle([(paper_margin, paper_top), (WIDTH - paper_margin, paper_bottom)], fill=cfg['CARD_COLOR'])
             draw.rectangle([(paper_margin, paper_top-20), (WIDTH - paper_margin, paper_top+20)], fill="#007ACC")
             tooth_size = 30
-            for i in range(int((WIDTH - 2 * paper_margin) / tooth_size) + 1):
-                cx_t = paper_margin + i * tooth_size + tooth_size/2
-                draw.ellipse((cx_t - tooth_size/2, paper_bottom - tooth_size/2, cx_t + tooth_size/2, paper_bottom + tooth_size/2), fill=cfg['BG_COLOR'])
+            img.paste(cfg['BG_COLOR'], (0, paper_bottom - tooth_size//2), _tooth_strip_mask(paper_margin, tooth_size))
             cx, cy, cw, ch = paper_margin, paper_top, WIDTH - 2*paper_margin, paper_bottom - paper_top
         
         elif self.template_name == 'quote':
@@ -465,9 +545,14 @@ class XHSGenerator:
         elif self.template_name == 'quote': start_y = 550
         else: start_y = cy + (ch - len(lines)*line_height) // 2
         
+        # 半透明高亮用的混合绘制对象与颜色，整个封面只创建一次
+        h_draw = h_color = None
+        if self.template_name in ('tech_card', 'notion'):
+            h_draw = ImageDraw.Draw(img, 'RGBA')
+            h_color = hex_to_rgba(cfg['ACCENT_COLOR'], 0.15 if self.template_name=='tech_card' else 0.2)
+        
         for i, line in enumerate(lines):
-            try: w = font.getlength(line.strip())
-            except: w = len(line)*font_size
+            w = _measure(font, line.strip())
             
             if self.template_name == 'quote': line_x = cx
             else: line_x = (WIDTH - w) // 2
@@ -475,12 +560,8 @@ class XHSGenerator:
             line_y = start_y + i * line_height
             
             if self.template_name == 'tech_card' or (self.template_name == 'notion' and i==0):
-                highlight = Image.new('RGBA', img.size, (0,0,0,0))
-                h_draw = ImageDraw.Draw(highlight)
-                h_color = hex_to_rgba(cfg['ACCENT_COLOR'], 0.15 if self.template_name=='tech_card' else 0.2)
+                # 半透明高亮直接混合绘制到原图，无需整图 alpha_composite
                 h_draw.rectangle([(line_x+10, line_y + font_size - 30), (line_x+w+10, line_y + font_size)], fill=h_color)
-                img.paste(Image.alpha_composite(img.convert('RGBA'), highlight), (0,0))
-                draw = ImageDraw.Draw(img)
             elif self.template_name in ['receipt', 'quote'] and (i > 0 or len(lines)==1 or i == len(lines)-1):
                 draw.rounded_rectangle([(line_x - 10, line_y + 10), (line_x + w + 10, line_y + font_size + 20)], radius=10, fill=cfg['ACCENT_COLOR'])
 
@@ -495,30 +576,34 @@ class XHSGenerator:
         if self.template_name == 'cyber':
             draw_text_centered(draw, (WIDTH/2, HEIGHT-150), ">>> " + self.footer_text + " <<<", get_font(FONT_PATH_EN, 40), cfg['ACCENT_COLOR'])
         elif self.template_name == 'receipt':
-            try: f_w = f_font.getlength(self.footer_text)
-            except: f_w = len(self.footer_text) * 40
+            f_w = _measure(f_font, self.footer_text)
             draw_text_native(draw, (WIDTH - 100 - f_w - 30, HEIGHT - 200 - 80), self.footer_text, f_font, "#B0B0B0")
         elif self.template_name != 'quote':
-            try: f_w = f_font.getlength(self.footer_text)
-            except: f_w = len(self.footer_text) * 40
+            f_w = _measure(f_font, self.footer_text)
             draw_text_native(draw, ((WIDTH - 100) - f_w, HEIGHT-150), self.footer_text, f_font, "#64748B" if self.template_name=='tech_card' else "#999")
 
-    def generate_cover(self, title):
+    def build_cover(self, title):
+        """绘制封面，返回 PIL Image (不落盘，调用方可自行编码到内存)"""
         clean_title = clean_text(title)
-        img = Image.new('RGB', (WIDTH, HEIGHT), "#FFFFFF")
-        draw = ImageDraw.Draw(img)
-        
-        if self.template_name == 'magazine':
-            self._draw_cover_magazine(img, draw, clean_title)
-        else:
-            self._draw_cover_standard(img, draw, clean_title)
-            
+        # 直接以模板底色创建画布 (magazine 会整幅覆盖，底色不影响)
+        img = Image.new('RGB', (WIDTH, HEIGHT), self.style['BG_COLOR'])
+        self._draw_cover(img, ImageDraw.Draw(img), clean_title)
+        return img
+
+    def generate_cover(self, title, sink=None):
+        """生成封面：默认写入输出目录并返回路径；传入 sink (如 BytesIO) 时写入 sink 并返回它，不落盘"""
+        img = self.build_cover(title)
+        if sink is not None:
+            img.save(sink, format='PNG', compress_level=PNG_COMPRESS_LEVEL)
+            return sink
         filename = "01_cover.png"
-        img.save(os.path.join(self.output_dir, filename))
+        path = os.path.join(self.output_dir, filename)
+        img.save(path, compress_level=PNG_COMPRESS_LEVEL)
         print(f"封面已生成: {filename}")
+        return path
 
-    def generate_body(self, content):
-        cfg = self.style
+    def layout_body(self, content):
+        """正文排版分页：返回每页的行列表 [[(类型, 文本), ...], ...]"""
         clean_content = clean_text(content)
         
         font_reg = get_font(FONT_PATH_REGULAR, BODY_FONT_SIZE)
@@ -526,74 +611,118 @@ class XHSGenerator:
         
         content_width = WIDTH - (CARD_MARGIN_OUTER * 2) - (CARD_PADDING_INNER * 2)
         
-        all_items = []
+        # 单趟排版 + 分页：逐段排版的同时推进纵向游标，不再先收集全部行再二次遍历
+        top = BODY_CARD_Y + CARD_PADDING_INNER
+        bottom = BODY_CARD_Y + BODY_CARD_H - CARD_PADDING_INNER
+        h_space = self._body_item_height('space')
+        h_title = self._body_item_height('title')
+        h_text = self._body_item_height('text')
+        
+        pages = []
+        current_page = []
+        cursor_y = top
         for para in clean_content.split('\n'):
             para = para.strip()
             if not para:
-                all_items.append(('space', ""))
-                continue
-            is_title = (para[0].isdigit() and "." in para[:3]) or para.startswith("#")
-            clean_para = para.lstrip("#").strip()
-            target_font = font_bold if is_title else font_reg
-            
-            layout_lines = layout_paragraph(clean_para, target_font, content_width)
-            for line in layout_lines:
-                all_items.append(('title' if is_title else 'text', line))
-
-        page_num = 1
-        card_x, card_y = CARD_MARGIN_OUTER, 150
-        card_w, card_h = WIDTH - (CARD_MARGIN_OUTER * 2), HEIGHT - 200
-        
-        def init_page_img():
-            img = Image.new('RGB', (WIDTH, HEIGHT), cfg['BG_COLOR'])
-            draw = ImageDraw.Draw(img)
-            
-            if self.template_name == 'tech_card':
-                draw.rounded_rectangle([(card_x+15, card_y+15), (card_x+card_w+15, card_y+card_h+15)], radius=30, fill=cfg['SHADOW_COLOR'])
-                draw.rounded_rectangle([(card_x, card_y), (card_x+card_w, card_y+card_h)], radius=30, fill=cfg['CARD_COLOR'])
-            elif self.template_name == 'cyber':
-                draw.rounded_rectangle([(card_x, card_y), (card_x+card_w, card_y+card_h)], radius=20, outline=cfg['ACCENT_COLOR'], width=2)
-                draw.rounded_rectangle([(card_x, card_y), (card_x+card_w, card_y+card_h)], radius=20, fill=cfg['CARD_COLOR'])
-            elif self.template_name == 'magazine':
-                draw.rectangle([(card_x, card_y), (card_x+card_w, card_y+card_h)], outline="#000", width=4, fill="#FFFFFF")
-            elif self.template_name in ['breath', 'quote_blue']:
-                # 呼吸感和蓝色引言：白色卡片 + 浅色边框
-                draw.rounded_rectangle([(card_x, card_y), (card_x+card_w, card_y+card_h)], radius=30, fill="#FFFFFF", outline="#E0E0E0", width=2)
+                runs = (('space', ""),)
+                h = h_space
             else:
-                draw.rounded_rectangle([(card_x, card_y), (card_x+card_w, card_y+card_h)], radius=30, fill=cfg['CARD_COLOR'])
+                is_title = (para[0].isdigit() and "." in para[:3]) or para.startswith("#")
+                clean_para = para.lstrip("#").strip()
+                item_type, h = ('title', h_title) if is_title else ('text', h_text)
+                runs = [(item_type, line) for line in layout_paragraph(clean_para, font_bold if is_title else font_reg, content_width)]
             
-            draw.text((card_x, 60), clean_text(self.header_text), font=get_font(FONT_PATH_BOLD, 40), fill=cfg['HEADER_COLOR'])
-            return img, draw
+            for item in runs:
+                if cursor_y + h > bottom:
+                    pages.append(current_page)
+                    current_page = []
+                    cursor_y = top
+                current_page.append(item)
+                cursor_y += h
+        pages.append(current_page)
+        return pages
+
+    @staticmethod
+    def _body_item_height(item_type):
+        if item_type == 'title':
+            return TITLE_FONT_SIZE + LINE_SPACING + 10
+        if item_type == 'space':
+            return PARA_SPACING
+        return BODY_FONT_SIZE + LINE_SPACING
+
+    def _init_body_page(self):
+        """新建正文页：复制缓存的底图，返回 (img, draw)"""
+        key = (self.template_name, self.header_text)
+        template = self._page_templates.get(key)
+        if template is None:
+            template = self._build_body_template()
+            self._page_templates[key] = template
+        img = template.copy()
+        return img, ImageDraw.Draw(img)
+
+    def _build_body_template(self):
+        """绘制正文页底图 (背景、卡片、页眉)，每页相同"""
+        cfg = self.style
+        card_x, card_y, card_w, card_h = BODY_CARD_X, BODY_CARD_Y, BODY_CARD_W, BODY_CARD_H
+        img = Image.new('RGB', (WIDTH, HEIGHT), cfg['BG_COLOR'])
+        draw = ImageDraw.Draw(img)
+        
+        _BODY_CARD_DRAWERS.get(self.template_name, _draw_body_card_default)(draw, cfg, (card_x, card_y, card_w, card_h))
+        
+        draw.text((card_x, 60), clean_text(self.header_text), font=get_font(FONT_PATH_BOLD, 40), fill=cfg['HEADER_COLOR'])
+        return img
 
-        img, draw = init_page_img()
-        cursor_y = card_y + CARD_PADDING_INNER
-        cursor_x = card_x + CARD_PADDING_INNER
+    def build_body_page(self, items):
+        """绘制单个正文页 (items 来自 layout_body)，返回 PIL Image (不落盘)"""
+        cfg = self.style
+        font_reg = get_font(FONT_PATH_REGULAR, BODY_FONT_SIZE)
+        font_bold = get_font(FONT_PATH_BOLD, TITLE_FONT_SIZE)
+        
+        title_color = cfg['ACCENT_COLOR'] if self.template_name == 'cyber' else cfg['TEXT_MAIN']
+        text_color = "#DDDDDD" if self.template_name == 'cyber' else ("#333333" if cfg['TEXT_MAIN'] != "#000000" else "#000000")
+        
+        img, draw = self._init_body_page()
+        cursor_y = BODY_CARD_Y + CARD_PADDING_INNER
+        cursor_x = BODY_CARD_X + CARD_PADDING_INNER
         
-        for item_type, text in all_items:
+        for item_type, text in items:
             if item_type == 'title':
-                h = TITLE_FONT_SIZE + LINE_SPACING + 10
-                font = font_bold
-                color = cfg['TEXT_MAIN']
-                if self.template_name == 'cyber': color = cfg['ACCENT_COLOR']
-            elif item_type == 'space':
-                h = PARA_SPACING
-            else:
-                h = BODY_FONT_SIZE + LINE_SPACING
-                font = font_reg
-                color = "#DDDDDD" if self.template_name == 'cyber' else ("#333333" if cfg['TEXT_MAIN'] != "#000000" else "#000000")
-            
-            if cursor_y + h > card_y + card_h - CARD_PADDING_INNER:
-                filename = f"02_body_{page_num}.png"
-                img.save(os.path.join(self.output_dir, filename))
-                print(f"正文页 {page_num} 已生成")
-                page_num += 1
-                img, draw = init_page_img()
-                cursor_y = card_y + CARD_PADDING_INNER
-            
-            if item_type != 'space':
-                draw_text_native(draw, (cursor_x, cursor_y), text, font, color)
-            cursor_y += h
-
+                draw_text_native(draw, (cursor_x, cursor_y), text, font_bold, title_color)
+            elif item_type != 'space':
+                draw_text_native(draw, (cursor_x, cursor_y), text, font_reg, text_color)
+            cursor_y += self._body_item_height(item_type)
+        return img
+
+    def render_body_page(self, items, page_num):
+        """渲染单个正文页并保存，返回图片路径"""
+        img = self.build_body_page(items)
         filename = f"02_body_{page_num}.png"
-        img.save(os.path.join(self.output_dir, filename))
-        print(f"正文页 {page_num} 已生成 (完成)")
+        path = os.path.join(self.output_dir, filename)
+        img.save(path, compress_level=PNG_COMPRESS_LEVEL)
+        print(f"正文页 {page_num} 已生成")
+        return path
+
+    def generate_body(self, content):
+        """生成全部正文页，返回图片路径列表"""
+        pages = self.layout_body(content)
+        return [self.render_body_page(items, page_num) for page_num, items in enumerate(pages, 1)]
+
+    async def generate_body_async(self, content):
+        """异步生成全部正文页：各页的绘制与 PNG 编码在线程中并发执行，返回图片路径列表 (按页序)"""
+        pages = self.layout_body(content)
+        return list(await asyncio.gather(*(
+            asyncio.to_thread(self.render_body_page, items, page_num)
+            for page_num, items in enumerate(pages, 1)
+        )))
+
+
+# ================= 5. 多进程渲染任务 =================
+# 模块级函数，供 ProcessPoolExecutor 在子进程中调用 (参数均为可 pickle 的基础类型)
+
+def render_cover_job(template_name, header_text, footer_text, output_dir, title):
+    generator = XHSGenerator(template_name, header_text, footer_text, output_dir=output_dir)
+    return generator.generate_cover(title)
+
+def render_body_page_job(template_name, header_text, footer_text, output_dir, items, page_num):
+    generator = XHSGenerator(template_name, header_text, footer_text, output_dir=output_dir)
+    return generator.render_body_page(items, page_num)
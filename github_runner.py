@@ -3,41 +3,54 @@ import asyncio
 import os
 import argparse
 import json
-from core.pipeline import PublishPipeline, Logger
+import logging
+
+# uvloop 可选 (Windows 无 uvloop，回退标准 asyncio 事件循环)
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+def snapshot_env():
+    """一次性读取所需环境变量，之后只读这份普通 dict"""
+    return {
+        'GEMINI_API_KEY': os.environ.get('GEMINI_API_KEY', ''),
+        'XHS_COOKIE': os.environ.get('XHS_COOKIE', ''),
+    }
 
 # 模拟配置管理器 (优先从环境变量读取)
 class EnvConfig:
-    def __init__(self, args):
+    def __init__(self, args, env=None):
         self.args = args
+        # env: 环境变量快照 (普通 dict)，未传入时现取
+        if env is None:
+            env = snapshot_env()
+        # 配置在运行期间不变，初始化时一次性取好，get() 只做一次字典查找
+        self._table = {
+            # 优先读环境变量 (GitHub Secrets)，空字符串视为未设置
+            'api_key': env.get('GEMINI_API_KEY') or None,
+            'xhs_cookie': env.get('XHS_COOKIE') or None,
+            'model': args.model,
+            # 其次读命令行参数
+            'template': args.template,
+            'prompt_style': args.prompt,
+        }
 
     def get(self, key, default=None):
-        # 优先读环境变量 (GitHub Secrets)
-        if key == 'api_key': 
-            return os.environ.get('GEMINI_API_KEY') or default
-        if key == 'xhs_cookie': 
-            return os.environ.get('XHS_COOKIE') or default
-        if key == 'model':
-            return self.args.model
-        
-        # 其次读命令行参数
-        if key == 'template':
-            return self.args.template
-        if key == 'prompt_style':
-            return self.args.prompt
-            
-        # 默认回退
-        return default
+        value = self._table.get(key)
+        # 未知键/未设置时回退到默认值
+        return default if value is None else value
 
     def set(self, key, value):
         pass # 环境变量只读，不需要保存
     
     def get_current_api_key(self):
         """获取 API Key"""
-        return os.environ.get('GEMINI_API_KEY') or ""
+        return self._table['api_key'] or ""
     
     def get_current_model(self):
         """获取模型名称"""
-        return self.args.model
+        return self._table['model']
     
     def is_silent_mode(self):
         """GitHub Actions 强制使用静默模式"""
@@ -47,41 +60,78 @@ class EnvConfig:
         """GitHub Actions 强制自动发布"""
         return True
 
-async def main():
-    # 1. 解析命令行参数
+class LogPump:
+    """非阻塞日志输出：回调只把日志放进有界队列，由单个写入任务批量写出
+    (stdout 是 Actions 日志收集器的管道，背压时 print 会卡住事件循环)"""
+
+    BATCH_SIZE = 64
+
+    def __init__(self, log, prefix="", maxsize=1024):
+        self.log = log
+        self.prefix = prefix
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.loop = asyncio.get_running_loop()
+        self._writer = None
+
+    def emit(self, msg):
+        """Logger 回调 (线程安全：渲染等步骤会在工作线程中写日志)"""
+        line = f"{self.prefix}{msg}"
+        try:
+            in_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            in_loop = False
+        if in_loop:
+            self._put(line)
+        else:
+            self.loop.call_soon_threadsafe(self._put, line)
+
+    def _put(self, line):
+        try:
+            self.queue.put_nowait(line)
+        except asyncio.QueueFull:
+            pass  # 严重背压时丢弃，不阻塞流水线
+
+    def start(self):
+        self._writer = asyncio.create_task(self._drain())
+
+    async def _drain(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.BATCH_SIZE and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            self.log.info("\n".join(batch))
+
+    def _flush(self):
+        batch = []
+        while not self.queue.empty():
+            batch.append(self.queue.get_nowait())
+        if batch:
+            self.log.info("\n".join(batch))
+
+    async def stop(self):
+        """停止写入任务并写出剩余日志"""
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        # 等待工作线程投递的日志进入队列
+        await asyncio.sleep(0)
+        self._flush()
+
+def parse_args(argv=None):
+    """解析命令行参数"""
     parser = argparse.ArgumentParser(description='Xiaohongshu Publisher CLI Runner')
     parser.add_argument("url", help="WeChat Article URL")
     parser.add_argument("--template", default="breath", help="Cover template name (e.g., tech_card, breath)")
     parser.add_argument("--model", default="gemini-3-flash-preview", help="AI Model name")
     parser.add_argument("--prompt", default="深度科技主笔", help="Prompt style name")
-    args = parser.parse_args()
+    return parser.parse_args(argv)
 
-    print(f"🚀 [GitHub Runner] Starting Pipeline...")
-    print(f"🔗 URL: {args.url}")
-    print(f"🎨 Template: {args.template}")
-    print(f"🧠 Model: {args.model}")
-    print(f"📝 Prompt Style: {args.prompt}")
-
-    # 2. 检查关键环境变量
-    if not os.environ.get('GEMINI_API_KEY'):
-        print("❌ Error: GEMINI_API_KEY environment variable is missing.")
-        sys.exit(1)
-    
-    if not os.environ.get('XHS_COOKIE'):
-        print("⚠️ Warning: XHS_COOKIE is missing. Publishing might require login (not supported in headless).")
-
-    # 3. 初始化管道
-    # 定义简单的日志回调，直接输出到控制台
-    logger = Logger(callback=lambda msg: print(f"[PIPELINE] {msg}"))
-    
-    # 创建环境变量配置
-    env_config = EnvConfig(args)
-    
-    # 用正确的参数初始化 Pipeline
-    pipeline = PublishPipeline(config_manager=env_config, logger=logger)
-    pipeline.image_template = args.template
-    
-    # 4. 加载提示词模板
+def load_prompt_template(target_style):
+    """从 prompts.json 加载指定提示词模板，找不到时使用第一个；失败返回 None"""
     prompts_file = os.path.join(os.path.dirname(__file__), "core", "prompts.json")
     prompt_template = None
     try:
@@ -90,7 +140,6 @@ async def main():
             templates = prompts_data.get("templates", [])
             
             # 查找匹配的 prompt style
-            target_style = args.prompt
             found = False
             for t in templates:
                 if t.get("name") == target_style:
@@ -105,13 +154,54 @@ async def main():
 
     except Exception as e:
         print(f"⚠️ 加载提示词失败: {e}")
+    return prompt_template or None
+
+def preflight(args):
+    """阶段一：只做轻量校验 (不导入 pipeline、不启动事件循环)
+    返回 (环境变量快照, 提示词模板)，配置有误时返回 None，让配置错误的运行尽快失败
+    """
+    print(f"🚀 [GitHub Runner] Starting Pipeline...")
+    print(f"🔗 URL: {args.url}")
+    print(f"🎨 Template: {args.template}")
+    print(f"🧠 Model: {args.model}")
+    print(f"📝 Prompt Style: {args.prompt}")
+
+    # 检查关键环境变量
+    env = snapshot_env()
+    if not env['GEMINI_API_KEY']:
+        print("❌ Error: GEMINI_API_KEY environment variable is missing.")
+        return None
     
+    if not env['XHS_COOKIE']:
+        print("⚠️ Warning: XHS_COOKIE is missing. Publishing might require login (not supported in headless).")
+
+    # 加载提示词模板
+    prompt_template = load_prompt_template(args.prompt)
     if not prompt_template:
         print("❌ Error: 无法加载提示词模板")
-        sys.exit(1)
+        return None
+    return env, prompt_template
+
+async def main(args, env, prompt_template):
+    """阶段二：导入 pipeline 并执行，返回进程退出码"""
+    # 延迟导入：pipeline 会连带导入 Playwright / Gemini / Pillow，校验失败时不必付出这部分启动开销
+    from core.pipeline import PublishPipeline, Logger
     
-    # 5. 执行流程
+    # 日志回调只入队，由后台任务批量输出到控制台
+    log_pump = LogPump(logging.getLogger("pipeline"), prefix="[PIPELINE] ")
+    log_pump.start()
+    logger = Logger(callback=log_pump.emit)
+    
+    # 创建环境变量配置
+    env_config = EnvConfig(args, env)
+    
+    # 用正确的参数初始化 Pipeline
+    pipeline = PublishPipeline(config_manager=env_config, logger=logger)
+    pipeline.image_template = args.template
+    
+    # 执行流程
     print("Step 1: Processing URL and Generating Content...")
+    success, error = False, None
     try:
         # 使用云端模式：轻量抓取 + 跳过发布
         success = await pipeline.run_full_pipeline(
@@ -119,19 +209,48 @@ async def main():
             prompt_template=prompt_template,
             cloud_mode=True  # GitHub Actions 云端模式
         )
-        
-        if success:
-            print("✅ [GitHub Runner] Workflow Completed Successfully!")
-            sys.exit(0)
-        else:
-            print("❌ [GitHub Runner] Workflow Failed.")
-            sys.exit(1)
-            
     except Exception as e:
-        print(f"❌ [GitHub Runner] Exception: {e}")
-        import traceback
-        traceback.print_exc()
-        sys.exit(1)
+        error = e
+    finally:
+        try:
+            # 无论成功与否都释放浏览器/连接池并等待后台归档，其日志仍经 log_pump 输出
+            await pipeline.aclose()
+        finally:
+            # 先写出流水线的剩余日志，再输出最终结果，保证顺序
+            await log_pump.stop()
+    
+    if error is not None:
+        logging.error(f"❌ [GitHub Runner] Exception: {error}", exc_info=error)
+        return 1
+    if success:
+        print("✅ [GitHub Runner] Workflow Completed Successfully!")
+        return 0
+    print("❌ [GitHub Runner] Workflow Failed.")
+    return 1
+
+def run(coro):
+    """运行顶层协程并返回其结果
+    - 关闭调试插桩 (不受 PYTHONASYNCIODEBUG 影响)
+    - 优先使用 uvloop；Python 3.12+ 启用 eager task：未挂起即完成的协程不再分配调度一轮
+    """
+    loop_factory = uvloop.new_event_loop if uvloop is not None else None
+    if hasattr(asyncio, "Runner"):
+        with asyncio.Runner(debug=False, loop_factory=loop_factory) as runner:
+            if hasattr(asyncio, "eager_task_factory"):
+                runner.get_loop().set_task_factory(asyncio.eager_task_factory)
+            return runner.run(coro)
+    # Python 3.10 无 asyncio.Runner
+    if uvloop is not None:
+        return uvloop.run(coro, debug=False)
+    return asyncio.run(coro, debug=False)
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    args = parse_args()
+    # 日志统一走 stdout 并按行刷新，GitHub Actions 日志中与 print 输出保持顺序
+    sys.stdout.reconfigure(line_buffering=True)
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout, format="%(message)s")
+    
+    checked = preflight(args)
+    if checked is None:
+        sys.exit(1)
+    sys.exit(run(main(args, *checked)) or 0)
@@ -9,11 +9,108 @@ import os
 import sys
 import json
 import base64
+import collections
 from config import config, AVAILABLE_MODELS, AVAILABLE_TEMPLATES, PROMPT_STYLES
 
 # 导入核心模块
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), "core"))
-from pipeline import PublishPipeline, Logger, ConfigManager as PipelineConfig
+from pipeline import PublishPipeline, Logger, ConfigManager as PipelineConfig, TEMP_OUTPUT_DIR
+
+# 日志刷新间隔 (秒)：这段时间内的日志合并为一次界面更新
+LOG_FLUSH_INTERVAL = 0.1
+# 日志区最多保留的行数：超出部分丢弃最早的，保持每次更新的序列化开销恒定
+LOG_MAX_LINES = 500
+# 界面刷新合并间隔 (秒)：约一帧 @60Hz
+UPDATE_INTERVAL = 0.016
+
+# prompts.json 候选位置 (按优先级)
+PROMPTS_PATHS = [
+    os.path.join(os.path.dirname(__file__), "core", "prompts.json"), # 新位置
+    os.path.join(os.path.dirname(__file__), "..", "微信推文链接直发小红书笔记脚本20260129", "一键发布工具", "prompts.json") # 旧位置
+]
+
+# 读取 prompts.json 失败时使用的兜底模板
+DEFAULT_PROMPT_TEMPLATE = """
+- Role: Deep Tech Columnist
+- Goal: 将提供的素材改写为一篇小红书爆款图文。
+- Output Format (JSON Only): {'cover_title': '', 'content_body': '', 'caption_title': ''}
+【素材来源】{url}
+【素材内容】{full_text}
+            """
+
+# ================== 界面样式 (模块级常量，所有控件共用同一份) ==================
+_INPUT_BGCOLOR = "#1a1a2e"
+_DARK_TEXT_STYLE = ft.TextStyle(color=ft.Colors.WHITE)
+_LABEL_TEXT_STYLE = ft.TextStyle(color=ft.Colors.WHITE54)
+
+# 主界面输入框 / 下拉框
+_MAIN_FIELD_KW = dict(
+    border_radius=12,
+    filled=True,
+    bgcolor=_INPUT_BGCOLOR,
+    border_color=ft.Colors.TRANSPARENT,
+    focused_border_color=ft.Colors.CYAN_400,
+    text_style=_DARK_TEXT_STYLE,
+    label_style=_LABEL_TEXT_STYLE,
+)
+# 编辑面板输入框
+_EDITOR_FIELD_KW = dict(
+    multiline=True,
+    border_radius=10,
+    filled=True,
+    bgcolor=_INPUT_BGCOLOR,
+    border_color=ft.Colors.TRANSPARENT,
+)
+# 设置对话框输入框 / 下拉框
+_SETTINGS_FIELD_KW = dict(
+    border_radius=10,
+    filled=True,
+    bgcolor=_INPUT_BGCOLOR,
+    text_style=_DARK_TEXT_STYLE,
+)
+
+
+def _main_button_style(color, hover_color):
+    """主按钮样式"""
+    return ft.ButtonStyle(
+        bgcolor={
+            ft.ControlState.DEFAULT: color,
+            ft.ControlState.HOVERED: hover_color,
+            ft.ControlState.DISABLED: ft.Colors.GREY_800,
+        },
+        color={
+            ft.ControlState.DEFAULT: ft.Colors.WHITE,
+            ft.ControlState.DISABLED: ft.Colors.WHITE24,
+        },
+        padding=ft.padding.symmetric(horizontal=30, vertical=18),
+        shape=ft.RoundedRectangleBorder(radius=14),
+        elevation={"": 4, "hovered": 8},
+    )
+
+
+_CYAN_BUTTON_STYLE = _main_button_style(ft.Colors.CYAN_700, ft.Colors.CYAN_600)
+_GREEN_BUTTON_STYLE = _main_button_style(ft.Colors.GREEN_700, ft.Colors.GREEN_600)
+_CYAN_OUTLINE_BUTTON_STYLE = ft.ButtonStyle(
+    color=ft.Colors.CYAN_400,
+    side=ft.BorderSide(1, ft.Colors.CYAN_400),
+)
+
+# 下拉框选项 (列表固定，导入时生成一次；桌面应用只有一个窗口，不会被多个页面共用)
+TEMPLATE_OPTIONS = [ft.dropdown.Option(key=k, text=v) for k, v in AVAILABLE_TEMPLATES]
+STYLE_OPTIONS = [ft.dropdown.Option(key=k, text=k) for k, v in PROMPT_STYLES]
+MODEL_OPTIONS = [ft.dropdown.Option(m) for m in AVAILABLE_MODELS]
+
+
+class AdapterConfig:
+    """Pipeline 配置适配器 (从全局 config 实时读取)"""
+    def get_current_api_key(self): return config.get("api_key")
+    def get_current_model(self): return config.get("model")
+    def is_silent_mode(self): return True # GUI 默认静默抓取
+    def is_auto_publish(self): return False
+    def get_proxy_url(self):
+        proxy = config.get_proxy()
+        return proxy["https"] if proxy else None
+
 
 class XHSPublisherApp:
     """主应用类"""
@@ -22,19 +119,63 @@ class XHSPublisherApp:
         self.page = page
         self.pipeline = None
         self.pipeline_config = PipelineConfig() # 适配 pipeline 的 config manager
+        # 待显示的日志 (日志回调可能来自多个线程，批量刷新到界面)
+        self._log_buffer = collections.deque()
+        self._log_lock = threading.Lock()
+        self._log_flush_scheduled = False
+        self._update_scheduled = False
+        # 设置对话框 (首次打开时构建，之后复用)
+        self._settings_dialog = None
+        self._settings_fields = {}
+        # Prompt 模板启动时读取一次: 名称 -> prompt
+        self._prompt_templates = self._load_prompt_templates()
         self.setup_page()
         self.build_ui()
         
+        # Pipeline 只创建一次，浏览器/HTTP 连接在多次生成之间保持复用
+        self.pipeline = PublishPipeline(config_manager=AdapterConfig(), logger=Logger(callback=self.log_callback))
+        self.pipeline.set_progress_callback(self.progress_callback)
+        # 上一次渲染的输入 (模板, 封面标题, 正文)，未变化时跳过重复渲染
+        self._last_render_sig = None
+        
         # 加载配置到 pipeline config
         self.sync_config()
     
+    def _load_prompt_templates(self):
+        """按优先级读取所有 prompts.json，返回 {名称: prompt} (同名以先找到的为准)"""
+        templates = {}
+        for path in PROMPTS_PATHS:
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                for t in data["templates"]:
+                    templates.setdefault(t["name"], t["prompt"])
+            except Exception as e:
+                print(f"⚠️ 读取 Prompt 失败 ({path}): {e}")
+        return templates
+
     def sync_config(self):
         """同步配置到 pipeline"""
-        pass
+        self._apply_gemini_proxy()
+
+    def _apply_gemini_proxy(self):
+        """把代理设置同步到环境变量 (仅供 Gemini SDK 使用)"""
+        proxy = config.get_proxy()
+        if proxy:
+            os.environ["HTTP_PROXY"] = proxy["http"]
+            os.environ["HTTPS_PROXY"] = proxy["https"]
+        else:
+            os.environ.pop("HTTP_PROXY", None)
+            os.environ.pop("HTTPS_PROXY", None)
 
     def close_dialog(self, dialog):
         dialog.open = False
         self.page.update()
+        # 关闭后移出 overlay，避免反复打开时 overlay 不断增长
+        if dialog in self.page.overlay:
+            self.page.overlay.remove(dialog)
 
     def setup_page(self):
         """页面初始化设置"""
@@ -80,43 +221,25 @@ class XHSPublisherApp:
             label="输入文章链接",
             hint_text="粘贴微信公众号文章链接...",
             prefix_icon=ft.Icons.LINK,
-            border_radius=12,
-            filled=True,
-            bgcolor="#1a1a2e",
-            border_color=ft.Colors.TRANSPARENT,
-            focused_border_color=ft.Colors.CYAN_400,
-            text_style=ft.TextStyle(color=ft.Colors.WHITE),
-            label_style=ft.TextStyle(color=ft.Colors.WHITE54),
+            **_MAIN_FIELD_KW,
         )
         
         # 快速配置区
         self.template_dropdown = ft.Dropdown(
             label="封面模板",
             value=config.get("template", "tech_card"),
-            options=[ft.dropdown.Option(key=k, text=v) for k, v in AVAILABLE_TEMPLATES],
-            border_radius=12,
-            filled=True,
-            bgcolor="#1a1a2e",
-            border_color=ft.Colors.TRANSPARENT,
-            focused_border_color=ft.Colors.CYAN_400,
-            text_style=ft.TextStyle(color=ft.Colors.WHITE),
-            label_style=ft.TextStyle(color=ft.Colors.WHITE54),
+            options=TEMPLATE_OPTIONS,
             expand=True,
+            **_MAIN_FIELD_KW,
         )
         self.template_dropdown.on_change = self.on_template_change
         
         self.style_dropdown = ft.Dropdown(
             label="写作风格",
             value=config.get("prompt_style", "深度科技主笔"),
-            options=[ft.dropdown.Option(key=k, text=k) for k, v in PROMPT_STYLES],
-            border_radius=12,
-            filled=True,
-            bgcolor="#1a1a2e",
-            border_color=ft.Colors.TRANSPARENT,
-            focused_border_color=ft.Colors.CYAN_400,
-            text_style=ft.TextStyle(color=ft.Colors.WHITE),
-            label_style=ft.TextStyle(color=ft.Colors.WHITE54),
+            options=STYLE_OPTIONS,
             expand=True,
+            **_MAIN_FIELD_KW,
         )
         self.style_dropdown.on_change = self.on_style_change
         
@@ -135,20 +258,7 @@ class XHSPublisherApp:
                 alignment=ft.MainAxisAlignment.CENTER,
                 spacing=8,
             ),
-            style=ft.ButtonStyle(
-                bgcolor={
-                    ft.ControlState.DEFAULT: ft.Colors.CYAN_700,
-                    ft.ControlState.HOVERED: ft.Colors.CYAN_600,
-                    ft.ControlState.DISABLED: ft.Colors.GREY_800,
-                },
-                color={
-                    ft.ControlState.DEFAULT: ft.Colors.WHITE,
-                    ft.ControlState.DISABLED: ft.Colors.WHITE24,
-                },
-                padding=ft.padding.symmetric(horizontal=30, vertical=18),
-                shape=ft.RoundedRectangleBorder(radius=14),
-                elevation={"": 4, "hovered": 8},
-            ),
+            style=_CYAN_BUTTON_STYLE,
             on_click=self.on_generate,
         )
 
@@ -162,20 +272,7 @@ class XHSPublisherApp:
                 alignment=ft.MainAxisAlignment.CENTER,
                 spacing=8,
             ),
-            style=ft.ButtonStyle(
-                bgcolor={
-                    ft.ControlState.DEFAULT: ft.Colors.GREEN_700,
-                    ft.ControlState.HOVERED: ft.Colors.GREEN_600,
-                    ft.ControlState.DISABLED: ft.Colors.GREY_800,
-                },
-                color={
-                    ft.ControlState.DEFAULT: ft.Colors.WHITE,
-                    ft.ControlState.DISABLED: ft.Colors.WHITE24,
-                },
-                padding=ft.padding.symmetric(horizontal=30, vertical=18),
-                shape=ft.RoundedRectangleBorder(radius=14),
-                elevation={"": 4, "hovered": 8},
-            ),
+            style=_GREEN_BUTTON_STYLE,
             on_click=self.on_publish,
             visible=False, # 初始隐藏
         )
@@ -197,12 +294,13 @@ class XHSPublisherApp:
             text_align=ft.TextAlign.CENTER,
         )
         
-        # 日志输出区域（可折叠）
-        self.log_view = ft.ListView(
+        # 日志输出区域（可折叠）：整段日志放在一个 Text 中，每次刷新只更新一个字符串属性
+        self._log_lines = collections.deque(maxlen=LOG_MAX_LINES)
+        self.log_text = ft.Text("", size=12, color=ft.Colors.WHITE70, font_family="Consolas", selectable=True)
+        self.log_view = ft.Column(
+            [self.log_text],
             expand=True,
-            spacing=5,
-            padding=10,
-            auto_scroll=True,
+            scroll=ft.ScrollMode.AUTO,
             height=150,
         )
         self.log_container = ft.Container(
@@ -243,11 +341,11 @@ class XHSPublisherApp:
             visible=False,
             border_radius=10,
         )
-        self.preview_grid = ft.Row(
-            wrap=True,
-            scroll=ft.ScrollMode.AUTO,
+        # 横向 ListView：只构建可见的预览图，图片多时不必一次性全部布局
+        self.preview_grid = ft.ListView(
+            horizontal=True,
             spacing=10,
-            run_spacing=10,
+            height=220,
         )
         
         self.preview_container = ft.Container(
@@ -316,27 +414,19 @@ class XHSPublisherApp:
         self.title_editor = ft.TextField(
             label="封面标题",
             hint_text="每行用换行分隔...",
-            multiline=True,
             min_lines=2,
             max_lines=3,
-            border_radius=10,
-            filled=True,
-            bgcolor="#1a1a2e",
-            border_color=ft.Colors.TRANSPARENT,
-            text_style=ft.TextStyle(color=ft.Colors.WHITE),
+            text_style=_DARK_TEXT_STYLE,
+            **_EDITOR_FIELD_KW,
         )
         
         self.content_editor = ft.TextField(
             label="正文内容",
             hint_text="Markdown 格式正文...",
-            multiline=True,
             min_lines=6,
             max_lines=12,
-            border_radius=10,
-            filled=True,
-            bgcolor="#1a1a2e",
-            border_color=ft.Colors.TRANSPARENT,
             text_style=ft.TextStyle(color=ft.Colors.WHITE, size=13),
+            **_EDITOR_FIELD_KW,
         )
         
         return ft.Container(
@@ -349,10 +439,7 @@ class XHSPublisherApp:
                     ft.OutlinedButton(
                         "重新生成",
                         icon=ft.Icons.REFRESH,
-                        style=ft.ButtonStyle(
-                            color=ft.Colors.CYAN_400,
-                            side=ft.BorderSide(1, ft.Colors.CYAN_400),
-                        ),
+                        style=_CYAN_OUTLINE_BUTTON_STYLE,
                         on_click=self.on_regenerate,
                     ),
 
@@ -362,64 +449,75 @@ class XHSPublisherApp:
         )
     
     def open_settings(self, e):
-        """打开设置对话框"""
+        """打开设置对话框 (对话框只构建一次，之后每次打开只刷新字段值)"""
+        if self._settings_dialog is None:
+            self._settings_dialog = self._build_settings_dialog()
+        
+        fields = self._settings_fields
+        proxy = config.get("proxy", {})
+        fields["api_key"].value = config.get("api_key", "")
+        fields["model"].value = config.get("model", "gemini-2.5-flash")
+        fields["execution_mode"].value = config.get("execution_mode", "manual")
+        fields["silent_publish"].value = config.get("silent_publish", False)
+        fields["proxy_enabled"].value = proxy.get("enabled", False)
+        fields["proxy"].value = proxy.get("http", "")
+        
+        dialog = self._settings_dialog
+        if dialog not in self.page.overlay:
+            self.page.overlay.append(dialog)
+        dialog.open = True
+        self.page.update()
+    
+    def _build_settings_dialog(self):
+        """构建设置对话框，字段控件保存在 self._settings_fields"""
         api_key_field = ft.TextField(
             label="Gemini API Key",
-            value=config.get("api_key", ""),
             password=True,
             can_reveal_password=True,
-            border_radius=10,
-            filled=True,
-            bgcolor="#1a1a2e",
-            text_style=ft.TextStyle(color=ft.Colors.WHITE),
+            **_SETTINGS_FIELD_KW,
         )
         
         model_dropdown = ft.Dropdown(
             label="AI 模型",
-            value=config.get("model", "gemini-2.5-flash"),
-            options=[ft.dropdown.Option(m) for m in AVAILABLE_MODELS],
-            border_radius=10,
-            filled=True,
-            bgcolor="#1a1a2e",
-            text_style=ft.TextStyle(color=ft.Colors.WHITE),
+            options=MODEL_OPTIONS,
+            **_SETTINGS_FIELD_KW,
         )
 
         # 运行模式配置
         mode_dropdown = ft.Dropdown(
             label="运行模式",
-            value=config.get("execution_mode", "manual"),
             options=[
                 ft.dropdown.Option("manual", "手动确认 (推荐)"),
                 ft.dropdown.Option("auto", "全自动直发"),
             ],
-            border_radius=10,
-            filled=True,
-            bgcolor="#1a1a2e",
-            text_style=ft.TextStyle(color=ft.Colors.WHITE),
+            **_SETTINGS_FIELD_KW,
         )
 
         silent_publish = ft.Switch(
             label="静默发布 (隐藏浏览器, 仅自动模式有效)",
-            value=config.get("silent_publish", False),
             active_color=ft.Colors.CYAN_400,
         )
         
         proxy_enabled = ft.Checkbox(
             label="启用代理",
-            value=config.get("proxy", {}).get("enabled", False),
             active_color=ft.Colors.CYAN_400,
         )
         
         proxy_field = ft.TextField(
             label="HTTP 代理地址",
-            value=config.get("proxy", {}).get("http", ""),
             hint_text="http://127.0.0.1:7890",
-            border_radius=10,
-            filled=True,
-            bgcolor="#1a1a2e",
-            text_style=ft.TextStyle(color=ft.Colors.WHITE),
+            **_SETTINGS_FIELD_KW,
         )
         
+        self._settings_fields = {
+            "api_key": api_key_field,
+            "model": model_dropdown,
+            "execution_mode": mode_dropdown,
+            "silent_publish": silent_publish,
+            "proxy_enabled": proxy_enabled,
+            "proxy": proxy_field,
+        }
+        
         def save_settings(e):
             config.set("api_key", api_key_field.value)
             config.set("model", model_dropdown.value)
@@ -430,17 +528,12 @@ class XHSPublisherApp:
                 "http": proxy_field.value,
                 "https": proxy_field.value,
             })
-            dialog.open = False
-            self.page.update()
+            self.close_dialog(dialog)
             self.show_snackbar("设置已保存", ft.Colors.GREEN_400)
             
-            # 更新环境变量
-            if config.get("proxy", {}).get("enabled"):
-                os.environ["HTTP_PROXY"] = proxy_field.value
-                os.environ["HTTPS_PROXY"] = proxy_field.value
-            else:
-                os.environ.pop("HTTP_PROXY", None)
-                os.environ.pop("HTTPS_PROXY", None)
+            # 抓取/发布的 HTTP 客户端和浏览器在下次使用时按新代理重建，无需改环境变量
+            # Gemini SDK 不支持按客户端配置代理，仍通过环境变量生效
+            self._apply_gemini_proxy()
         
         dialog = ft.AlertDialog(
             title=ft.Text("设置", color=ft.Colors.WHITE),
@@ -471,9 +564,7 @@ class XHSPublisherApp:
                 ),
             ],
         )
-        self.page.overlay.append(dialog)
-        dialog.open = True
-        self.page.update()
+        return dialog
     
     def on_template_change(self, e):
         print(f"DEBUG: On Template Change: {e.control.value}")
@@ -483,14 +574,49 @@ class XHSPublisherApp:
         config.set("prompt_style", e.control.value)
     
     def log_callback(self, msg):
-        """日志回调"""
-        self.log_view.controls.append(ft.Text(msg, size=12, color=ft.Colors.WHITE70, font_family="Consolas"))
-        self.log_view.scroll_to(offset=-1, duration=200)
+        """日志回调 (只入缓冲区，LOG_FLUSH_INTERVAL 后统一刷新界面)"""
+        with self._log_lock:
+            self._log_buffer.append(msg)
+            if self._log_flush_scheduled:
+                return
+            self._log_flush_scheduled = True
+        timer = threading.Timer(LOG_FLUSH_INTERVAL, self._flush_logs)
+        timer.daemon = True
+        timer.start()
+
+    def _flush_logs(self):
+        """把缓冲的日志一次性写入日志区 (最多保留 LOG_MAX_LINES 行)，只触发一次 page.update()"""
+        with self._log_lock:
+            msgs = list(self._log_buffer)
+            self._log_buffer.clear()
+            self._log_flush_scheduled = False
+        if not msgs:
+            return
+        self._log_lines.extend(msgs)
+        self.log_text.value = "\n".join(self._log_lines)
         self.page.update()
+        # 每次刷新只滚动一次，且不带动画 (auto_scroll 的滚动动画在高频日志下会互相打断)
+        self.log_view.scroll_to(offset=-1, duration=0)
 
     def progress_callback(self, value):
-        """进度回调"""
+        """进度回调 (可能来自工作线程，此时直接刷新)"""
         self.progress_bar.value = value / 100.0
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            self.page.update()
+        else:
+            self._schedule_update()
+
+    def _schedule_update(self):
+        """合并界面刷新：同一帧 (UPDATE_INTERVAL) 内的多次修改只触发一次 page.update()，须在事件循环中调用"""
+        if self._update_scheduled:
+            return
+        self._update_scheduled = True
+        asyncio.get_running_loop().call_later(UPDATE_INTERVAL, self._do_update)
+
+    def _do_update(self):
+        self._update_scheduled = False
         self.page.update()
 
     def on_generate(self, e):
@@ -508,26 +634,19 @@ class XHSPublisherApp:
         # UI 状态重置
         self.status_text.value = "🚀 正在初始化..."
         self.status_text.color = ft.Colors.CYAN_400
-        self.status_text.color = ft.Colors.CYAN_400
         self.generate_btn.disabled = True
         self.publish_btn.visible = False # 重新生成时隐藏发布按钮
         self.action_area.visible = False
         self.progress_bar.visible = True
         self.progress_bar.value = 0
         self.log_container.visible = True
-        self.log_view.controls.clear()
+        self._log_lines.clear()
+        self.log_text.value = ""
         self.preview_grid.controls.clear() 
-        self.page.update()
-        
-        # 准备 Pipeline 配置适配器
-        class AdapterConfig:
-             def get_current_api_key(self): return config.get("api_key")
-             def get_current_model(self): return config.get("model")
-             def is_silent_mode(self): return True # GUI 默认静默抓取
-             def is_auto_publish(self): return False
         
-        logger = Logger(callback=self.log_callback)
-        self.pipeline = PublishPipeline(config_manager=AdapterConfig(), logger=logger)
+        # 清空上一次的运行数据 (临时图片删除，浏览器/HTTP 连接保留)
+        self.pipeline.reset_run_state()
+        self._last_render_sig = None
 
         # 强制同步 UI 状态到 pipeline (避免 on_change 未触发)
         ui_template = self.template_dropdown.value
@@ -538,59 +657,22 @@ class XHSPublisherApp:
         else:
             self.pipeline.image_template = config.get("template")
 
-        self.pipeline.set_progress_callback(self.progress_callback)
-        # self.pipeline.image_template 已经在上面设置了
-
-        # 获取 Prompt 模板 (硬编码演示，实际应读取文件)
+        # 获取 Prompt 模板 (启动时已读取，找不到同名模板时用第一个)
         prompt_style_name = self.style_dropdown.value # 同样从UI读取风格
         if prompt_style_name:
              config.set("prompt_style", prompt_style_name)
         else:
              prompt_style_name = config.get("prompt_style")
 
-        prompt_template = ""
-        try:
-             import json
-             # 尝试在多个位置查找 prompts.json
-             paths_to_check = [
-                 os.path.join(os.path.dirname(__file__), "core", "prompts.json"), # 新位置
-                 os.path.join(os.path.dirname(__file__), "..", "微信推文链接直发小红书笔记脚本20260129", "一键发布工具", "prompts.json") # 旧位置
-             ]
-             
-             for path in paths_to_check:
-                 if os.path.exists(path):
-                     with open(path, "r", encoding="utf-8") as f:
-                         data = json.load(f)
-                         for t in data["templates"]:
-                             if t["name"] == prompt_style_name:
-                                 prompt_template = t["prompt"]
-                                 break
-                         if prompt_template: break
-             
-             if not prompt_template and data:
-                  prompt_template = data["templates"][0]["prompt"]
-                  
-        except Exception as e:
-            self.log_callback(f"⚠️ 读取 Prompt 失败: {e}")
-            prompt_template = """
-- Role: Deep Tech Columnist
-- Goal: 将提供的素材改写为一篇小红书爆款图文。
-- Output Format (JSON Only): {'cover_title': '', 'content_body': '', 'caption_title': ''}
-【素材来源】{url}
-【素材内容】{full_text}
-            """
+        # 兜底模板非空，这里总能拿到可用的模板
+        prompt_template = self._prompt_templates.get(prompt_style_name) \
+            or next(iter(self._prompt_templates.values()), DEFAULT_PROMPT_TEMPLATE)
 
-        if not prompt_template:
-            self.show_snackbar("未找到 Prompt 模板", ft.Colors.RED_400)
-            self.status_text.value = "❌ 错误: 未找到Prompt模板"
-            self.generate_btn.disabled = False
-            return
+        # 所有界面状态改完后统一刷新一次
+        self.page.update()
 
-        # 异步运行
-        def run_thread():
-            asyncio.run(self._run_async_pipeline(url, prompt_template))
-        
-        threading.Thread(target=run_thread, daemon=True).start()
+        # 在 Flet 的事件循环上运行 (长期存在，浏览器/HTTP 连接可在生成与发布之间复用)
+        self.page.run_task(self._run_async_pipeline, url, prompt_template)
 
     async def _run_async_pipeline(self, url, prompt_template):
         try:
@@ -599,31 +681,19 @@ class XHSPublisherApp:
             if not scrape_data: raise Exception("抓取失败")
             
             # 2. AI 生成
-            ai_data = self.pipeline.generate_content(prompt_template)
+            ai_data = await self.pipeline.generate_content(prompt_template)
             if not ai_data: raise Exception("AI 生成失败")
             
             # 更新编辑器内容 (回到主线程)
             self.title_editor.value = ai_data.get("cover_title", "")
             self.content_editor.value = ai_data.get("content_body", "")
-            self.page.update()
+            self._schedule_update()
 
-            # 3. 渲染
-            img_paths = self.pipeline.render_images()
+            # 3. 渲染并逐张显示预览图 (绘制在进程池/线程中进行，不阻塞界面事件循环)
+            img_paths = await self._stream_previews()
             if not img_paths: raise Exception("渲染失败")
             
-            # 显示预览图
-            # 使用 base64 避免文件缓存问题
-            base64_images = [self._get_image_base64(p) for p in img_paths]
-            
-            self.preview_grid.controls.clear()
-            for b64 in base64_images:
-                self.preview_grid.controls.append(
-                   ft.Image(src=f"data:image/png;base64,{b64}", width=150, height=200, fit="contain", border_radius=8)
-                )
-            
             # 4. 完成
-            # 4. 完成
-            self.status_text.value = "✅ 生成完成！"
             self.status_text.color = ft.Colors.GREEN_400
             self.progress_bar.value = 1.0
 
@@ -631,29 +701,56 @@ class XHSPublisherApp:
             mode = config.get("execution_mode", "manual")
             if mode == "auto":
                 self.status_text.value = "🚀 正在自动发布..."
-                self.page.update()
+                self._schedule_update()
                 # 自动发布
                 silent = config.get("silent_publish", False)
                 await self._run_async_publish(headless=silent, auto_publish=True)
             else:
                 # 手动模式：显示发布按钮
+                self.status_text.value = "✅ 生成完成！"
                 self.publish_btn.visible = True
                 self.action_area.visible = True
                 self.publish_btn.disabled = False
-                self.page.update()
-            
+                self._schedule_update()
             
         except Exception as e:
             self.status_text.value = f"❌ 错误: {str(e)}"
             self.status_text.color = ft.Colors.RED_400
         finally:
+            # 浏览器/HTTP 连接保留到发布结束 (同一事件循环上复用)，不在此处关闭
             self.generate_btn.disabled = False
-            self.page.update()
-
-    def _get_image_base64(self, path):
-        """读取图片并转换为 base64"""
-        with open(path, "rb") as f:
-            return base64.b64encode(f.read()).decode("utf-8")
+            self._schedule_update()
+
+    def _render_sig(self):
+        """当前渲染输入的签名"""
+        ai_data = self.pipeline.ai_data or {}
+        return (self.pipeline.image_template, ai_data.get("cover_title"), ai_data.get("content_body"))
+
+    async def _stream_previews(self):
+        """逐张渲染，每画完一张立即显示预览，返回全部图片路径"""
+        sig = self._render_sig()
+        self.preview_grid.controls.clear()
+        async for p in self.pipeline.render_images_iter():
+            self.preview_grid.controls.append(self._preview_image(p))
+            self._schedule_update()
+        img_paths = self.pipeline.image_paths
+        if img_paths:
+            self._last_render_sig = sig
+        return img_paths
+
+    def _preview_image(self, path):
+        """预览图控件：渲染目录即 Flet 的 assets 目录，只传短路径 (?v=修改时间 避免读到旧图)；
+        不在 assets 目录下的图片才内嵌为 base64"""
+        try:
+            rel = os.path.relpath(path, TEMP_OUTPUT_DIR)
+        except ValueError:  # Windows 下不在同一盘符
+            rel = os.pardir
+        if rel.startswith(os.pardir):
+            with open(path, "rb") as f:
+                src = f"data:image/png;base64,{base64.b64encode(f.read()).decode('ascii')}"
+        else:
+            src = f"/{rel.replace(os.sep, '/')}?v={os.stat(path).st_mtime_ns}"
+        return ft.Image(src=src, width=150, height=200, fit="contain", border_radius=8)
 
     def on_regenerate(self, e):
         """重新生成 (只重新渲染)"""
@@ -675,37 +772,32 @@ class XHSPublisherApp:
         self.pipeline.image_template = config.get("template")
         print(f"DEBUG: Template set to {self.pipeline.image_template}")
 
+        if self.pipeline.image_paths and self._render_sig() == self._last_render_sig:
+            self.show_snackbar("内容和模板均未修改，无需重新渲染", ft.Colors.CYAN_400)
+            return
+
         self.status_text.value = "🎨 正在重新渲染..."
         self.status_text.color = ft.Colors.CYAN_400
         self.page.update()
         
-        def run_regenerate():
-            print("DEBUG: Thread started")
-            try:
-                img_paths = self.pipeline.render_images()
-                print(f"DEBUG: Render finished, paths: {img_paths}")
-                if not img_paths: raise Exception("渲染返回为空")
-
-                # 回到主线程更新UI
-                # 使用 base64 避免文件缓存问题
-                base64_images = [self._get_image_base64(p) for p in img_paths]
-                
-                self.preview_grid.controls.clear()
-                for b64 in base64_images:
-                    self.preview_grid.controls.append(
-                        ft.Image(src=f"data:image/png;base64,{b64}", width=150, height=200, fit="contain", border_radius=8)
-                    )
-                self.status_text.value = "✅ 重新渲染完成"
-                self.status_text.color = ft.Colors.GREEN_400
-                self.page.update()
-                print("DEBUG: UI updated")
-            except Exception as ex:
-                print(f"DEBUG: Exception in thread: {ex}")
-                self.status_text.value = f"❌ 渲染失败: {str(ex)}"
-                self.status_text.color = ft.Colors.RED_400
-                self.page.update()
-        
-        threading.Thread(target=run_regenerate, daemon=True).start()
+        self.page.run_task(self._run_regenerate)
+
+    async def _run_regenerate(self):
+        print("DEBUG: Regenerate task started")
+        try:
+            img_paths = await self._stream_previews()
+            print(f"DEBUG: Render finished, paths: {img_paths}")
+            if not img_paths: raise Exception("渲染返回为空")
+
+            self.status_text.value = "✅ 重新渲染完成"
+            self.status_text.color = ft.Colors.GREEN_400
+            self._schedule_update()
+            print("DEBUG: UI updated")
+        except Exception as ex:
+            print(f"DEBUG: Exception in regenerate: {ex}")
+            self.status_text.value = f"❌ 渲染失败: {str(ex)}"
+            self.status_text.color = ft.Colors.RED_400
+            self._schedule_update()
     
     def on_publish(self, e):
         """发布 (手动触发)"""
@@ -721,52 +813,43 @@ class XHSPublisherApp:
             self._trigger_publish(headless=False, auto_publish=False)
 
     def _trigger_publish(self, headless=False, auto_publish=False):
-        # 检查模板是否一致，如果不一致则自动重新渲染
+        # 检查模板是否一致，如果不一致则自动重新渲染 (模板和内容都与上次渲染相同时跳过)
         current_template = config.get("template")
         if self.pipeline and self.pipeline.image_template != current_template:
             self.show_snackbar(f"检测到模板变更 ({self.pipeline.image_template} -> {current_template})，正在重新渲染...", ft.Colors.CYAN_400)
-            self.page.update()
-            try:
-                self.pipeline.image_template = current_template
-                img_paths = self.pipeline.render_images()
-                if not img_paths: raise Exception("重新渲染失败")
-                # 更新预览
-                base64_images = [self._get_image_base64(p) for p in img_paths]
-                self.preview_grid.controls.clear()
-                for b64 in base64_images:
-                     self.preview_grid.controls.append(
-                        ft.Image(src=f"data:image/png;base64,{b64}", width=150, height=200, fit="contain", border_radius=8)
-                     )
-                self.page.update()
-            except Exception as e:
-                self.show_snackbar(f"自动渲染失败: {e}", ft.Colors.RED_400)
-                return
+            self.pipeline.image_template = current_template
+        rerender = bool(self.pipeline and self.pipeline.ai_data and self._render_sig() != self._last_render_sig)
 
-        if not self.pipeline or not self.pipeline.image_paths:
+        if not rerender and (not self.pipeline or not self.pipeline.image_paths):
              self.show_snackbar("没有可发布的内容", ft.Colors.ORANGE_400)
              return
         
-        self.status_text.value = "🚀 正在发布..."
+        self.status_text.value = "🎨 正在重新渲染..." if rerender else "🚀 正在发布..."
         self.generate_btn.disabled = True
         self.publish_btn.disabled = True
         self.page.update()
 
-        def run_publish():
-            asyncio.run(self._run_async_publish(headless, auto_publish))
-        
-        threading.Thread(target=run_publish, daemon=True).start()
+        # 重新渲染也放在任务中 (进程池绘制)，不阻塞事件处理
+        self.page.run_task(self._run_async_publish, headless, auto_publish, rerender)
 
-    async def _run_async_publish(self, headless=False, auto_publish=False):
+    async def _run_async_publish(self, headless=False, auto_publish=False, rerender=False):
         try:
+            if rerender:
+                if not await self._stream_previews():
+                    self.status_text.value = "❌ 自动渲染失败"
+                    return
+                self.status_text.value = "🚀 正在发布..."
+                self._schedule_update()
             success = await self.pipeline.publish(headless=headless, auto_publish=auto_publish)
             if success:
                 self.status_text.value = "✅ 发布流程已结束"
             else:
                 self.status_text.value = "❌ 发布失败"
         finally:
+            await self.pipeline.close_sessions()
             self.generate_btn.disabled = False
             self.publish_btn.disabled = False
-            self.page.update()
+            self._schedule_update()
     
     def show_snackbar(self, message: str, color=ft.Colors.WHITE):
         """显示提示"""
@@ -779,9 +862,11 @@ class XHSPublisherApp:
         self.page.update()
 
 
-def main(page: ft.Page):
+async def main(page: ft.Page):
     XHSPublisherApp(page)
 
 
 if __name__ == "__main__":
-    ft.app(target=main)
+    # 预览图直接从渲染目录按路径加载，不再以 base64 嵌入控件树
+    os.makedirs(TEMP_OUTPUT_DIR, exist_ok=True)
+    ft.app(target=main, assets_dir=TEMP_OUTPUT_DIR)
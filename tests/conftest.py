@@ -0,0 +1,48 @@
+# tests/conftest.py
+# 测试路径设置与共享数据 (每个 worker 进程只执行一次)
+
+import os
+import sys
+import json
+import functools
+import pytest
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_ROOT)
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "core"))
+
+PROMPTS_PATH = os.path.join(PROJECT_ROOT, "core", "prompts.json")
+
+
+@functools.cache
+def load_prompts():
+    """读取并解析 prompts.json (进程内只读一次，按字节读入，json.loads 直接解码)，失败返回 None"""
+    try:
+        with open(PROMPTS_PATH, 'rb', buffering=64 * 1024) as f:
+            return json.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+@pytest.fixture(scope="session")
+def prompts_path():
+    return PROMPTS_PATH
+
+
+@pytest.fixture(scope="session")
+def prompts_data():
+    """解析后的 prompts.json"""
+    data = load_prompts()
+    assert data is not None, "prompts.json 无法读取或不是有效 JSON"
+    return data
+
+
+def pytest_generate_tests(metafunc):
+    """用到 prompt_template 参数的用例按提示词模板逐个展开 (收集阶段复用同一份解析结果)"""
+    if "prompt_template" in metafunc.fixturenames:
+        templates = (load_prompts() or {}).get("templates", [])
+        metafunc.parametrize(
+            "prompt_template", templates,
+            ids=[t.get("name", "?") if isinstance(t, dict) else "?" for t in templates],
+        )
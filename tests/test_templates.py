@@ -1,80 +1,156 @@
 # tests/test_templates.py
 # 小红书发布工具单元测试
+# 并行运行: pytest -n auto --dist=loadfile (需安装 requirements-dev.txt 中的 pytest-xdist)
+# 每个用例只写自己的输出目录，可安全地分到多个 worker 进程
 
+import io
 import os
-import sys
+import re
+import copy
+import uuid
+import asyncio
+import hashlib
 import pytest
-import json
 
-# 添加项目根目录到路径
-PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-sys.path.insert(0, PROJECT_ROOT)
-sys.path.insert(0, os.path.join(PROJECT_ROOT, "core"))
+# 路径设置见 conftest.py
+# 这里只导入轻量模块；渲染引擎和流水线 (依赖 Pillow 等) 通过下面的 fixture 按需导入
+from config import AVAILABLE_MODELS, AVAILABLE_TEMPLATES
+from core.styles import STYLES
+from core.config_manager import ConfigManager
+from core.llm_cache import LLMCache, make_cache_key
 
-from core.xhs_core import XHSGenerator, STYLES, find_font, FONT_PATH_REGULAR
+
+# 每个模板必须有的字段
+_REQUIRED_FIELDS = frozenset(('BG_COLOR', 'CARD_COLOR', 'TEXT_MAIN', 'ACCENT_COLOR', 'type'))
+
+# 颜色格式 (HEX)
+_HEX_RE = re.compile(r'^#[0-9A-Fa-f]{6}$').match
+
+# 渲染测试用到的模板
+RENDER_TEMPLATES = ['breath', 'tech_card', 'notion']
+
+
+@pytest.fixture(scope="session")
+def xhs_core():
+    """渲染引擎模块 (只在用到的用例中导入 Pillow；未安装时跳过)"""
+    pytest.importorskip("PIL")
+    import core.xhs_core
+    return core.xhs_core
+
+
+@pytest.fixture(scope="session")
+def pipeline_mod(xhs_core):
+    """发布流水线模块 (依赖 Gemini SDK / Playwright 等，缺少依赖时跳过)"""
+    return pytest.importorskip("core.pipeline")
+
+
+@pytest.fixture(scope="session")
+def base_generators(xhs_core, tmp_path_factory):
+    """每个模板只构建一次生成器 (字体、模板样式在整个测试会话内共享)"""
+    base_dir = tmp_path_factory.mktemp("base")
+    return {
+        name: xhs_core.XHSGenerator(
+            template_name=name,
+            header_text="测试头部",
+            footer_text="测试尾部",
+            output_dir=str(base_dir / name)
+        )
+        for name in RENDER_TEMPLATES
+    }
+
+
+@pytest.fixture(scope="class")
+def render_dir(tmp_path_factory):
+    """同一测试类共用的渲染输出目录"""
+    return tmp_path_factory.mktemp("render")
+
+
+@pytest.fixture
+def make_generator(base_generators, render_dir):
+    """浅拷贝会话级生成器，只把输出目录换成共用目录下的唯一子目录 (文件名固定，按目录区分用例)"""
+    def make(template_name, output_dir=None):
+        gen = copy.copy(base_generators[template_name])
+        gen.output_dir = str(output_dir or render_dir / uuid.uuid4().hex)
+        os.makedirs(gen.output_dir, exist_ok=True)
+        return gen
+    return make
+
+
+@pytest.fixture(scope="session")
+def cached_render():
+    """正文渲染结果按 (模板, 页眉, 页脚, 正文哈希) 缓存，同一会话内相同输入只渲染一次"""
+    cache = {}
+    def run(gen, content):
+        key = (gen.template_name, gen.header_text, gen.footer_text, hashlib.sha256(content.encode('utf-8')).digest())
+        if key not in cache:
+            cache[key] = gen.generate_body(content)
+        return cache[key]
+    return run
 
 
 class TestTemplates:
     """测试模板配置"""
     
-    def test_all_templates_exist(self):
+    @pytest.mark.parametrize("template", ['breath', 'tech_card', 'cyber', 'magazine', 'notion', 'sticky', 'ticket'])
+    def test_all_templates_exist(self, template):
         """测试所有模板都有配置"""
-        required_templates = ['breath', 'tech_card', 'cyber', 'magazine', 'notion', 'sticky', 'ticket']
-        for template in required_templates:
-            assert template in STYLES, f"模板 {template} 不存在于 STYLES 中"
+        assert template in STYLES, f"模板 {template} 不存在于 STYLES 中"
     
-    def test_template_has_required_fields(self):
-        """测试每个模板都有必需字段"""
-        required_fields = ['BG_COLOR', 'CARD_COLOR', 'TEXT_MAIN', 'ACCENT_COLOR', 'type']
-        for name, style in STYLES.items():
-            for field in required_fields:
-                assert field in style, f"模板 {name} 缺少字段 {field}"
+    @pytest.mark.parametrize("name, style", list(STYLES.items()), ids=list(STYLES))
+    def test_template_has_required_fields(self, name, style):
+        """测试每个模板都有必需字段，一次列出该模板的所有缺失"""
+        missing = sorted(_REQUIRED_FIELDS - style.keys())
+        assert not missing, f"模板 {name} 缺少字段: {missing}"
     
     def test_color_format(self):
-        """测试颜色格式正确 (HEX)"""
-        import re
-        hex_pattern = re.compile(r'^#[0-9A-Fa-f]{6}$')
-        for name, style in STYLES.items():
-            for key in ['BG_COLOR', 'CARD_COLOR', 'TEXT_MAIN', 'ACCENT_COLOR']:
-                color = style.get(key)
-                if color:  # 有些可能是 None
-                    assert hex_pattern.match(color), f"模板 {name} 的 {key} 颜色格式错误: {color}"
+        """测试颜色格式正确 (HEX)，一次列出所有错误"""
+        bad = [
+            (name, key, color)
+            for name, style in STYLES.items()
+            for key in ('BG_COLOR', 'CARD_COLOR', 'TEXT_MAIN', 'ACCENT_COLOR')
+            if (color := style.get(key)) and not _HEX_RE(color)  # 有些可能是 None
+        ]
+        assert not bad, f"颜色格式错误 (模板, 字段, 值): {bad}"
 
 
 class TestFonts:
     """测试字体加载"""
     
-    def test_font_path_found(self):
+    def test_font_path_found(self, xhs_core):
         """测试能找到中文字体"""
-        assert FONT_PATH_REGULAR is not None, "找不到任何中文字体文件"
+        assert xhs_core.FONT_PATH_REGULAR is not None, "找不到任何中文字体文件"
+    
+    def test_find_font_cached(self, xhs_core):
+        """测试字体查找结果被缓存 (列表参数也可命中)"""
+        names = ["msyh.ttc", "NotoSansCJK-Regular.ttc"]
+        first = xhs_core.find_font(names, fallback="fallback.ttf")
+        hits = xhs_core._find_font.cache_info().hits
+        assert xhs_core.find_font(list(names), fallback="fallback.ttf") == first
+        assert xhs_core._find_font.cache_info().hits == hits + 1
     
-    def test_font_file_exists(self):
+    def test_font_file_exists(self, xhs_core):
         """测试字体文件存在"""
-        if FONT_PATH_REGULAR:
-            assert os.path.exists(FONT_PATH_REGULAR), f"字体文件不存在: {FONT_PATH_REGULAR}"
+        font_path = xhs_core.FONT_PATH_REGULAR
+        if font_path:
+            assert os.path.exists(font_path), f"字体文件不存在: {font_path}"
 
 
 class TestRendering:
     """测试图片渲染"""
     
     @pytest.fixture
-    def generator(self, tmp_path):
+    def generator(self, make_generator):
         """创建测试用生成器"""
-        return XHSGenerator(
-            template_name="breath",
-            header_text="测试头部",
-            footer_text="测试尾部",
-            output_dir=str(tmp_path)
-        )
+        return make_generator("breath")
     
-    def test_cover_generation(self, generator, tmp_path):
-        """测试封面生成"""
-        cover_path = generator.generate_cover("标题测试\n第二行")
-        assert cover_path is not None
-        assert os.path.exists(cover_path)
-        assert cover_path.endswith('.png')
+    def test_cover_generation(self, generator):
+        """测试封面生成 (写入内存，不落盘)"""
+        buf = io.BytesIO()
+        assert generator.generate_cover("标题测试\n第二行", sink=buf) is buf
+        assert buf.tell() > 0
+        assert buf.getvalue()[:8] == b'\x89PNG\r\n\x1a\n'
     
-    def test_body_generation(self, generator, tmp_path):
+    def test_body_generation(self, generator, cached_render):
         """测试正文页生成"""
         body_content = """## 测试标题
         
@@ -84,60 +160,49 @@ class TestRendering:
 
 更多内容在这里。带有一些 emoji 🎉 和中文标点符号。
 """
-        pages = generator.generate_body(body_content)
+        pages = cached_render(generator, body_content)
         assert pages is not None
         assert len(pages) >= 1
         for page in pages:
             assert os.path.exists(page)
     
-    def test_all_templates_render(self, tmp_path):
-        """测试所有模板都能渲染"""
-        for template_name in ['breath', 'tech_card', 'notion']:
-            gen = XHSGenerator(
-                template_name=template_name,
-                header_text="测试",
-                footer_text="测试",
-                output_dir=str(tmp_path / template_name)
-            )
-            cover = gen.generate_cover("模板测试")
-            assert cover is not None, f"模板 {template_name} 封面渲染失败"
+    def test_body_generation_async(self, generator):
+        """测试异步正文页生成与同步结果一致"""
+        body_content = "\n".join(f"第{i}段测试正文内容，用于验证分页。" for i in range(60))
+        pages = asyncio.run(generator.generate_body_async(body_content))
+        assert len(pages) > 1
+        assert pages == [os.path.join(generator.output_dir, f"02_body_{n}.png") for n in range(1, len(pages) + 1)]
+        for page in pages:
+            assert os.path.exists(page)
+    
+    @pytest.mark.parametrize("template_name", RENDER_TEMPLATES)
+    def test_all_templates_render(self, make_generator, template_name):
+        """测试所有模板都能渲染 (每个模板独立用例，可分到不同 worker 并行)"""
+        gen = make_generator(template_name)
+        cover = gen.generate_cover("模板测试")
+        assert cover is not None, f"模板 {template_name} 封面渲染失败"
+        assert os.path.exists(cover)
+        assert cover.endswith('.png')
 
 
 class TestPrompts:
-    """测试提示词配置"""
-    
-    @pytest.fixture
-    def prompts_path(self):
-        return os.path.join(PROJECT_ROOT, "core", "prompts.json")
+    """测试提示词配置 (prompts_path / prompts_data 及按模板展开见 conftest.py)"""
     
     def test_prompts_file_exists(self, prompts_path):
         """测试提示词文件存在"""
         assert os.path.exists(prompts_path), "prompts.json 不存在"
     
-    def test_prompts_valid_json(self, prompts_path):
+    def test_prompts_valid_json(self, prompts_data):
         """测试提示词是有效 JSON"""
-        with open(prompts_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        assert "templates" in data, "prompts.json 缺少 templates 字段"
-    
-    def test_prompts_have_required_fields(self, prompts_path):
-        """测试每个提示词模板都有必需字段"""
-        with open(prompts_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        for template in data["templates"]:
-            assert "name" in template, "提示词模板缺少 name"
-            assert "prompt" in template, "提示词模板缺少 prompt"
+        assert "templates" in prompts_data, "prompts.json 缺少 templates 字段"
     
-    def test_prompts_contain_placeholders(self, prompts_path):
-        """测试提示词包含必要占位符"""
-        with open(prompts_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        for template in data["templates"]:
-            prompt = template["prompt"]
-            assert "{url}" in prompt, f"提示词 {template['name']} 缺少 {{url}} 占位符"
-            assert "{full_text}" in prompt, f"提示词 {template['name']} 缺少 {{full_text}} 占位符"
+    def test_prompt_template(self, prompt_template):
+        """测试每个提示词模板都有必需字段和必要占位符"""
+        assert "name" in prompt_template, "提示词模板缺少 name"
+        assert "prompt" in prompt_template, "提示词模板缺少 prompt"
+        prompt = prompt_template["prompt"]
+        assert "{url}" in prompt, f"提示词 {prompt_template['name']} 缺少 {{url}} 占位符"
+        assert "{full_text}" in prompt, f"提示词 {prompt_template['name']} 缺少 {{full_text}} 占位符"
 
 
 class TestConfig:
@@ -145,13 +210,11 @@ class TestConfig:
     
     def test_available_models(self):
         """测试可用模型列表"""
-        from config import AVAILABLE_MODELS
         assert "gemini-3-flash-preview" in AVAILABLE_MODELS
         assert len(AVAILABLE_MODELS) >= 3
     
     def test_available_templates(self):
         """测试可用模板列表"""
-        from config import AVAILABLE_TEMPLATES
         template_names = [t[0] for t in AVAILABLE_TEMPLATES]
         assert "breath" in template_names
         assert "tech_card" in template_names
@@ -160,30 +223,138 @@ class TestConfig:
 class TestPipelineIntegration:
     """测试发布流水线集成"""
     
-    def test_pipeline_init(self):
+    @pytest.fixture
+    def pipeline(self, pipeline_mod):
+        """创建测试用流水线"""
+        return pipeline_mod.PublishPipeline(config_manager=ConfigManager())
+    
+    def test_pipeline_init(self, pipeline_mod):
         """测试流水线初始化"""
-        from core.pipeline import PublishPipeline, Logger
-        from core.config_manager import ConfigManager
-        
         config = ConfigManager()
-        logger = Logger()
-        pipeline = PublishPipeline(config_manager=config, logger=logger)
+        logger = pipeline_mod.Logger()
+        pipeline = pipeline_mod.PublishPipeline(config_manager=config, logger=logger)
         
         assert pipeline is not None
         assert pipeline.scraped_data is None
         assert pipeline.ai_data is None
     
-    def test_logger_works(self, tmp_path):
-        """测试日志记录"""
-        from core.pipeline import Logger
+    def test_smart_wrap_title(self, pipeline):
+        """测试标题智能换行：不拆英文单词，最多 3 行"""
+        wrapped = pipeline._smart_wrap_title("OpenAI发布全新模型震撼全球科技圈了")
+        lines = wrapped.split('\n')
+        
+        assert len(lines) <= 3
+        assert lines[0] == "OpenAI发"
+        assert ''.join(lines) == "OpenAI发布全新模型震撼全球科技圈了"
+    
+    def test_reset_run_state(self, pipeline):
+        """测试重置运行数据后可复用同一流水线"""
+        pipeline.ai_data = {"cover_title": "标题", "content_body": "正文"}
+        pipeline.image_paths = pipeline.render_images()
+        render_dir = os.path.dirname(pipeline.image_paths[0])
+        browser = pipeline.browser
+        
+        pipeline.reset_run_state()
+        
+        assert pipeline.ai_data is None
+        assert pipeline.image_paths == []
+        assert not os.path.exists(render_dir)
+        assert pipeline.browser is browser
+    
+    def test_render_images_iter(self, pipeline, tmp_path):
+        """测试逐张渲染与一次性渲染的结果一致"""
+        pipeline.ai_data = {"cover_title": "标题", "content_body": "\n".join(f"第{i}段正文" for i in range(40))}
+        expected = [os.path.basename(p) for p in pipeline.render_images(str(tmp_path / "sync"))]
+        
+        async def collect():
+            return [p async for p in pipeline.render_images_iter(str(tmp_path / "iter"))]
+        
+        paths = asyncio.run(collect())
+        assert [os.path.basename(p) for p in paths] == expected
+        assert pipeline.image_paths == paths
+        for path in paths:
+            assert os.path.exists(path)
+    
+    def test_fork_keeps_parent_http_client(self, pipeline_mod):
+        """测试配置代理时，子流水线关闭后父流水线的 HTTP 连接池仍可用"""
+        class ProxyConfig(ConfigManager):
+            def get_proxy_url(self):
+                return "http://127.0.0.1:7890"
         
+        async def run():
+            parent = pipeline_mod.PublishPipeline(config_manager=ProxyConfig())
+            job = parent._fork()
+            assert job._ensure_http() is parent._http
+            await job.aclose()
+            assert not parent._http.is_closed
+            assert parent._ensure_http() is job._http
+            await parent.aclose()
+        
+        asyncio.run(run())
+    
+    def test_run_batch_bounded_and_ordered(self, pipeline_mod, monkeypatch):
+        """测试批量处理：并发数不超过上限，结果与链接顺序一致，且不关闭共用的日志器"""
+        running = 0
+        peak = 0
+        
+        async def fake_run(job, url, prompt_template, cloud_mode=False):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            # 让靠前的链接更晚完成，检验结果顺序不受完成顺序影响
+            await asyncio.sleep(0.01 * (5 - int(url)))
+            running -= 1
+            return int(url) % 2 == 0
+        
+        monkeypatch.setattr(pipeline_mod.PublishPipeline, "run_full_pipeline", fake_run)
+        logger = pipeline_mod.Logger(callback=lambda msg: None)
+        closed = []
+        monkeypatch.setattr(logger, "close", lambda: closed.append(True))
+        pipeline = pipeline_mod.PublishPipeline(config_manager=ConfigManager(), logger=logger)
+        
+        async def run():
+            try:
+                return await pipeline.run_batch([str(i) for i in range(5)], "default", concurrency=2)
+            finally:
+                await pipeline.close_sessions()
+        
+        results = asyncio.run(run())
+        
+        assert results == [True, False, True, False, True]
+        assert 1 < peak <= 2
+        assert closed == []
+    
+    def test_logger_works(self, pipeline_mod):
+        """测试日志记录"""
         messages = []
-        logger = Logger(callback=lambda msg: messages.append(msg))
+        logger = pipeline_mod.Logger(callback=messages.append)
         logger.log("测试消息")
         
         assert len(messages) == 1
         assert "测试消息" in messages[0]
 
 
+class TestLLMCache:
+    """测试 AI 响应缓存"""
+    
+    def test_cache_roundtrip(self, tmp_path):
+        """测试缓存读写"""
+        cache = LLMCache(path=str(tmp_path / "cache.db"))
+        key = make_cache_key("gemini-2.5-flash", "模板 {full_text}", "原文")
+        assert cache.get(key) is None
+        
+        cache.set(key, '{"cover_title": "标题"}')
+        assert cache.get(key) == '{"cover_title": "标题"}'
+        cache.close()
+    
+    def test_cache_key_covers_all_inputs(self):
+        """测试缓存键随模型/模板/原文变化"""
+        base = make_cache_key("m", "t", "x")
+        assert base == make_cache_key("m", "t", "x")
+        assert base != make_cache_key("m2", "t", "x")
+        assert base != make_cache_key("m", "t2", "x")
+        assert base != make_cache_key("m", "t", "x2")
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])